@@ -0,0 +1,18 @@
+"""Lets benchmarks import modules from src without starting the bot
+
+Importing `src` runs `src/__init__.py`, which reads the bot token and loads every extension.
+Benchmarks only need individual modules, so the package is registered without running its `__init__`.
+"""
+import os
+import sys
+import types
+
+ROOT: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def bootstrap() -> None:
+    if "src" in sys.modules:
+        return
+    package = types.ModuleType("src")
+    package.__path__ = [os.path.join(ROOT, "src")]
+    sys.modules["src"] = package
@@ -0,0 +1,76 @@
+"""Measures WarningModel write and read throughput with and without the SQLite storage profile
+
+Usage:
+    python benchmarks/database_throughput.py [rows] [members]
+
+Each configuration runs against a fresh database in a temporary directory.
+Writes commit one row at a time, as automod did before warnings were batched, which is the worst case for syncing.
+"""
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+from typing import Dict
+
+from _bootstrap import bootstrap
+
+_tmp = tempfile.TemporaryDirectory()
+# The database module creates its engine on import, keep it away from the real database
+os.environ.setdefault("eternal_db_url", f"sqlite:///{_tmp.name}/import.db")
+bootstrap()
+
+from sqlalchemy import desc, func  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from src.database.database import Base, create_database_engine  # noqa: E402
+from src.database.models.warning import WarningModel  # noqa: E402
+
+
+def run(name: str, profile: bool, rows: int, members: int) -> Dict[str, float]:
+    engine = create_database_engine(f"sqlite:///{_tmp.name}/{name}.db", profile=profile)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    moderator = SimpleNamespace(id=0)
+
+    start = time.perf_counter()
+    for i in range(rows):
+        with Session() as session:
+            session.add(WarningModel(SimpleNamespace(id=i % members), moderator, "Benchmark"))
+            session.commit()
+    write_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with Session() as session:
+        for member_id in range(members):
+            session.query(WarningModel).filter_by(memberId=member_id).order_by(
+                desc(WarningModel.time)
+            ).limit(50).all()
+            session.query(func.count(WarningModel.warningId)).filter_by(
+                memberId=member_id
+            ).scalar()
+    read_time = time.perf_counter() - start
+    engine.dispose()
+    return {"writes/s": rows / write_time, "reads/s": members / read_time}
+
+
+def main() -> None:
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    members = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    print(f"{rows} single-row commits, {members} /warnings lookups")
+    results = {
+        "default": run("default", False, rows, members),
+        "profile": run("profile", True, rows, members),
+    }
+    for name, result in results.items():
+        print(
+            f"{name:>8}: {result['writes/s']:10.1f} writes/s {result['reads/s']:10.1f} reads/s"
+        )
+    print(
+        f" speedup: {results['profile']['writes/s'] / results['default']['writes/s']:10.2f}x writes"
+        f"   {results['profile']['reads/s'] / results['default']['reads/s']:10.2f}x reads"
+    )
+
+
+if __name__ == "__main__":
+    main()
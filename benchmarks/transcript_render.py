@@ -0,0 +1,176 @@
+"""Measures transcript export throughput, memory and output size against a fake channel history
+
+Usage:
+    python benchmarks/transcript_render.py [messages] [threads]
+
+Every mode is exported in every output format, and in all formats at once:
+    channel: A full export of a channel with `messages` messages
+    incremental: An incremental export of 1% new messages, after a full export of the channel
+    threads: /transcriptthreads over `threads` archived threads, `messages` messages in total
+
+The channel history is generated on the fly, so no guild or network is needed. Each case runs in its own process with
+a fresh database and archive in a temporary directory, so the peak RSS of one case doesn't hide another's.
+Only the chosen formats are rendered, so the rows of one mode compare the cost of each format. The size is that of the
+transcripts sent for the chosen formats.
+"""
+import asyncio
+import datetime
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+from typing import AsyncIterator, Dict, List
+
+from _bootstrap import bootstrap
+
+MODES: List[str] = ["channel", "incremental", "threads"]
+FORMATS: List[str] = ["html", "jsonl", "md", "html,jsonl,md"]
+
+_EPOCH = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+_WORDS = "the quick brown fox jumps over lazy dog transcript export message thread channel discord".split()
+
+
+def _peak_rss() -> int:
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def run_case(mode: str, formats: str, messages: int, threads: int) -> Dict[str, float]:
+    tmp = tempfile.TemporaryDirectory()
+    # Both are read when the modules are imported, keep them away from the real database and archive
+    os.environ["eternal_db_url"] = f"sqlite:///{tmp.name}/benchmark.db"
+    os.environ["eternal_transcript_archive_dir"] = os.path.join(tmp.name, "archive")
+    os.environ["eternal_transcript_mirror_assets"] = "False"
+    bootstrap()
+
+    import discord
+
+    from src.commands.transcript.export import export_transcript
+    from src.commands.transcript.jobs import ThreadTranscriptionRunner
+    from src.commands.transcript.render import parse_formats
+
+    rng = random.Random(0)
+    authors = [
+        SimpleNamespace(
+            id=1000 + i,
+            name=f"member{i}",
+            color=discord.Colour(rng.randrange(0xFFFFFF)),
+            display_avatar=f"https://cdn.discordapp.com/avatars/{1000 + i}/{rng.getrandbits(64):x}.png",
+        )
+        for i in range(50)
+    ]
+
+    class FakeHistory:
+        """Generates `count` messages, oldest first, the way TextChannel.history pages through them"""
+        id: int
+        name: str
+        count: int
+
+        def history(
+            self, limit: int | None = None, after: discord.Object | None = None, oldest_first: bool = True
+        ) -> AsyncIterator[SimpleNamespace]:
+            return self._history(0 if after is None else after.id - self.id * 10**7)
+
+        async def _history(self, start: int) -> AsyncIterator[SimpleNamespace]:
+            for i in range(start + 1, self.count + 1):
+                if i % 100 == 0:
+                    await asyncio.sleep(0)  # One page of history per request
+                author = authors[i % len(authors)]
+                yield SimpleNamespace(
+                    id=self.id * 10**7 + i,
+                    channel=self,
+                    author=author,
+                    content=" ".join(rng.choices(_WORDS, k=rng.randrange(1, 40))),
+                    attachments=[
+                        SimpleNamespace(url=f"https://cdn.discordapp.com/attachments/{self.id}/{i}/image.png")
+                    ]
+                    if i % 10 == 0
+                    else [],
+                    created_at=_EPOCH + datetime.timedelta(seconds=i),
+                )
+
+    class FakeChannel(FakeHistory, discord.TextChannel):
+        def __init__(self, id: int, count: int) -> None:
+            self.id = id
+            self.name = f"channel-{id}"
+            self.guild = SimpleNamespace(id=1)
+            self.count = count
+
+        async def archived_threads(self) -> AsyncIterator["FakeThread"]:
+            per_thread = max(messages // threads, 1)
+            for i in range(threads):
+                yield FakeThread(self.id + 1 + i, self.id, per_thread)
+
+    class FakeThread(FakeHistory, discord.Thread):
+        def __init__(self, id: int, parent_id: int, count: int) -> None:
+            self.id = id
+            self.parent_id = parent_id
+            self._type = discord.ChannelType.public_thread
+            self.name = f"thread-{id}"
+            self.guild = SimpleNamespace(id=1)
+            self.count = count
+
+    format_names = parse_formats(formats)
+    out_dir = os.path.join(tmp.name, "out")
+    os.makedirs(out_dir)
+    channel = FakeChannel(1, messages)
+
+    async def measure() -> int:
+        if mode == "channel":
+            stats = await export_transcript(channel, out_dir, channel.name, format_names)
+            return stats.count
+        if mode == "incremental":
+            await export_transcript(channel, out_dir, channel.name, format_names)
+            channel.count += max(messages // 100, 1)
+            start = time.perf_counter()
+            stats = await export_transcript(channel, out_dir, channel.name, format_names, incremental=True)
+            measure.elapsed = time.perf_counter() - start  # type: ignore
+            return stats.count
+        result = await ThreadTranscriptionRunner(out_dir, format_names).run(channel.archived_threads())
+        return result.message_count
+
+    start = time.perf_counter()
+    count = asyncio.run(measure())
+    elapsed = getattr(measure, "elapsed", time.perf_counter() - start)
+    size = sum(
+        os.path.getsize(os.path.join(out_dir, file))
+        for file in os.listdir(out_dir)
+        if file.rsplit(".", 1)[-1] in format_names
+    )
+    tmp.cleanup()
+    return {"messages": count, "messages/s": count / elapsed, "peak rss": _peak_rss(), "size": size}
+
+
+def main() -> None:
+    if sys.argv[1:2] == ["--case"]:
+        mode, formats, messages, threads = sys.argv[2], sys.argv[3], int(sys.argv[4]), int(sys.argv[5])
+        print(json.dumps(run_case(mode, formats, messages, threads)))
+        return
+
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    print(f"{messages} messages, {threads} threads")
+    print(f"{'mode':>12} {'formats':>14} {'messages':>9} {'messages/s':>11} {'peak rss':>10} {'size':>10}")
+    for mode in MODES:
+        for formats in FORMATS:
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--case", mode, formats, str(messages), str(threads)],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(
+                f"{mode:>12} {formats:>14} {result['messages']:>9} {result['messages/s']:>11.0f} "
+                f"{result['peak rss'] / 2**20:>8.1f}MB {result['size'] / 2**20:>8.1f}MB"
+            )
+
+
+if __name__ == "__main__":
+    main()
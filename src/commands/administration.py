@@ -1,11 +1,120 @@
-from typing import List
+from datetime import datetime
+from typing import List, Tuple
 
 import discord
 from discord.ext import commands
-from sqlalchemy import desc, func
+from sqlalchemy import Select, desc, select, tuple_
 
-from ..database import get_session
+from ..config.administration_config import (
+    WARNINGS_PAGE_SIZE,
+    WARNINGS_REASON_LENGTH,
+    WARNINGS_VIEW_TIMEOUT,
+)
+from ..database import run_in_session
 from ..database.models.warning import WarningModel
+from ..database.models.warning_count import WarningCountModel
+
+# Position after the last warning of a page, warnings are ordered latest first by (time, warningId)
+Cursor = Tuple[datetime, int]
+
+
+def warning_page_statement(member_id: int, cursor: Cursor | None, page_size: int = WARNINGS_PAGE_SIZE) -> Select:
+    """Builds the query behind fetch_warning_page, which fetches one extra warning to tell whether a page follows.
+
+    Served by the ix_warnings_memberId_time_warningId index, without sorting.
+    """
+    statement = select(WarningModel).where(WarningModel.memberId == member_id)
+    if cursor is not None:
+        statement = statement.where(tuple_(WarningModel.time, WarningModel.warningId) < cursor)
+    return statement.order_by(desc(WarningModel.time), desc(WarningModel.warningId)).limit(page_size + 1)
+
+
+async def fetch_warning_page(
+    member_id: int, cursor: Cursor | None, page_size: int = WARNINGS_PAGE_SIZE
+) -> Tuple[List[WarningModel], bool]:
+    """Fetches a page of a member's warnings, latest first.
+
+    Args:
+        member_id (int): The member whose warnings to fetch
+        cursor (Cursor | None): The position after which the page starts, None for the first page
+        page_size (int): How many warnings to fetch
+
+    Returns:
+        List[WarningModel]: The warnings on the page
+        bool: Whether there are more warnings after this page
+    """
+    statement = warning_page_statement(member_id, cursor, page_size)
+    warnings: List[WarningModel] = await run_in_session(
+        lambda session: list(session.scalars(statement).all())
+    )
+    return warnings[:page_size], len(warnings) > page_size
+
+
+async def fetch_warning_count(member_id: int) -> int:
+    count: WarningCountModel | None = await run_in_session(
+        lambda session: session.get(WarningCountModel, member_id)
+    )
+    return 0 if count is None else count.count
+
+
+class WarningsView(discord.ui.View):
+    """Pages through a member's warnings using Previous/Next buttons"""
+    author_id: int
+    member: discord.Member
+    warning_count: int
+    has_next: bool
+    _cursors: List[Cursor | None]
+    _last_cursor: Cursor | None
+
+    def __init__(self, author_id: int, member: discord.Member, warning_count: int):
+        super().__init__(timeout=WARNINGS_VIEW_TIMEOUT)
+        self.author_id = author_id
+        self.member = member
+        self.warning_count = warning_count
+        self.has_next = False
+        # Start cursor of every page up to the current one, so we can go back without offsets
+        self._cursors = [None]
+        self._last_cursor = None
+
+    async def load(self) -> str:
+        """Fetches the current page and returns the message describing it"""
+        warnings, self.has_next = await fetch_warning_page(self.member.id, self._cursors[-1])
+        self._last_cursor = (
+            (warnings[-1].time, warnings[-1].warningId) if warnings else None
+        )
+        self.previous.disabled = len(self._cursors) <= 1
+        self.next.disabled = not self.has_next
+        return self.render(warnings)
+
+    def render(self, warnings: List[WarningModel]) -> str:
+        if not warnings:
+            return f"{self.member.mention} has {self.warning_count} total warnings: \n- none :)"
+        page_count = max(-(-self.warning_count // WARNINGS_PAGE_SIZE), 1)
+        lines = [
+            f"<t:{round(warning.time.timestamp())}> "
+            + (warning.reason or "No reason given")[:WARNINGS_REASON_LENGTH]
+            for warning in warnings
+        ]
+        return (
+            f"{self.member.mention} has {self.warning_count} total warnings "
+            + f"(page {len(self._cursors)}/{page_count}): \n- "
+            + "\n- ".join(lines)
+        )
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return interaction.user.id == self.author_id
+
+    @discord.ui.button(label="Previous", style=discord.ButtonStyle.secondary)
+    async def previous(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if len(self._cursors) > 1:
+            self._cursors.pop()
+        await interaction.response.edit_message(content=await self.load(), view=self)
+
+    @discord.ui.button(label="Next", style=discord.ButtonStyle.secondary)
+    async def next(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if self.has_next and self._last_cursor is not None:
+            self._cursors.append(self._last_cursor)
+        await interaction.response.edit_message(content=await self.load(), view=self)
 
 
 class All(commands.Cog):
@@ -22,31 +131,12 @@ class All(commands.Cog):
     @commands.has_permissions(moderate_members=True)
     @commands.cooldown(1, 2, commands.BucketType.member)
     async def warnings(self, ctx: commands.Context, member: discord.Member):
-        warnings: List[WarningModel] = []
-        warnings_text: List[str] = ["none :)"]
-        with get_session() as session:
-            warnings = (
-                session.query(WarningModel)
-                .filter_by(memberId=member.id)
-                .order_by(desc(WarningModel.time)) # type: ignore
-                .limit(50)
-                .all()
-            )
-            warning_count = (
-                session.query(func.count(WarningModel.warningId))
-                .filter_by(memberId=member.id)
-                .scalar()
-            )
-            if len(warnings) > 0:
-                warnings_text: List[str] = [
-                    f"<t:{round(warning.time.timestamp())}> {warning.reason}"
-                    for warning in warnings
-                ]
-        # TODO: If a member has way too many warnings, we might need to handle messages longer than 2000 chars by sending multiple messages.
-        # The terrible ternary will add "(showing at most 50 latest)" to the message if the user has more than 50 warnings
+        # Queries run on the database thread, so the event loop keeps handling the gateway meanwhile
+        view = WarningsView(ctx.author.id, member, await fetch_warning_count(member.id))
+        content = await view.load()
         await ctx.send(
-            f"{member.mention} has {warning_count} total warnings{' (showing at most 50 latest)' if warning_count > 50 else ''}: \n- "
-            + "\n- ".join(warnings_text),
+            content,
+            view=view if view.has_next else None, # type: ignore
             ephemeral=True,
         )
 
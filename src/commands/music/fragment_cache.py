@@ -0,0 +1,149 @@
+import logging
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Iterable, Set
+
+from ...config.music_config import CACHE_DIR, CACHE_MAX_BYTES
+
+logger = logging.getLogger("strongest.fragment_cache")
+
+# Files which are still being written
+_TEMPORARY_SUFFIXES = (".part", ".ytdl", ".tmp")
+
+
+class FragmentCache:
+    """Keeps the downloaded fragments in `cache_dir` under a byte budget.
+
+    Fragments are stored as `cache_dir/<vid>/<file>`. Once the cache grows past `max_bytes`, the least recently used
+    fragments are deleted until it fits again, except for those of songs which a playlist pinned with `set_active`.
+    The last access is stored as the file's modification time, so the order survives restarts.
+    The cache directory is scanned on first use, without holding the lock, and `touch` updates the file on disk,
+    so the event loop should call these through `asyncio.to_thread`.
+    """
+    cache_dir: str
+    max_bytes: int
+    _entries: "OrderedDict[str, int]"
+    _total: int
+    _pins: "weakref.WeakKeyDictionary[object, Set[str]]"
+    _lock: threading.Lock
+    _load_lock: threading.Lock
+    _loaded: bool
+
+    def __init__(self, cache_dir: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES) -> None:
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._total = 0
+        self._pins = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._loaded = False
+
+    @property
+    def total_bytes(self) -> int:
+        """The size of every cached fragment combined"""
+        self._load()
+        with self._lock:
+            return self._total
+
+    def add(self, path: str) -> None:
+        """Records a newly downloaded fragment, then evicts fragments if the cache is over budget"""
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return
+        path = os.path.normpath(path)
+        self._load()
+        with self._lock:
+            self._total += size - self._entries.pop(path, 0)
+            self._entries[path] = size
+        self.evict()
+
+    def touch(self, path: str) -> None:
+        """Marks a fragment as the most recently used one"""
+        path = os.path.normpath(path)
+        self._load()
+        with self._lock:
+            if path not in self._entries:
+                return
+            self._entries.move_to_end(path)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def set_active(self, owner: object, vids: Iterable[str]) -> None:
+        """Pins the fragments of the given videos, replacing whatever `owner` pinned before.
+
+        Args:
+            owner (object): Whoever needs the fragments, e.g. a playlist, pins are dropped once it's garbage collected
+            vids (Iterable[str]): The videos which are playing or being preloaded, empty to unpin everything
+        """
+        with self._lock:
+            self._pins[owner] = set(vids)
+
+    def evict(self) -> int:
+        """Deletes the least recently used fragments which aren't pinned, until the cache fits in the budget
+
+        Returns:
+            int: The number of bytes freed
+        """
+        freed = 0
+        self._load()
+        with self._lock:
+            if self._total <= self.max_bytes:
+                return 0
+            pinned = set().union(*self._pins.values())
+            for path, size in list(self._entries.items()):
+                if self._total <= self.max_bytes:
+                    break
+                if os.path.basename(os.path.dirname(path)) in pinned:
+                    continue
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    logger.warning("Failed to evict %s: %s", path, e)
+                    continue
+                del self._entries[path]
+                self._total -= size
+                freed += size
+                try:
+                    os.rmdir(os.path.dirname(path))
+                except OSError:
+                    pass  # Other fragments of the video are still cached
+        if freed:
+            logger.info("Evicted %d bytes of fragments, %d bytes cached", freed, self._total)
+        return freed
+
+    def _load(self) -> None:
+        # Scans the cache directory on first use. The lock is only taken to store the result, so set_active, which is
+        # called from the event loop, never waits for the scan.
+        if self._loaded:
+            return
+        with self._load_lock:
+            if self._loaded:
+                return
+            found = []
+            try:
+                directories = [entry for entry in os.scandir(self.cache_dir) if entry.is_dir()]
+            except FileNotFoundError:
+                directories = []
+            for directory in directories:
+                for entry in os.scandir(directory.path):
+                    if not entry.is_file() or entry.name.endswith(_TEMPORARY_SUFFIXES):
+                        continue
+                    stat = entry.stat()
+                    found.append((stat.st_mtime, os.path.normpath(entry.path), stat.st_size))
+            with self._lock:
+                for _, path, size in sorted(found):
+                    self._entries[path] = size
+                    self._total += size
+                self._loaded = True
+            logger.info("Found %d cached fragments, %d bytes", len(found), self._total)
+
+
+fragment_cache: FragmentCache = FragmentCache()
@@ -1,7 +1,9 @@
+import asyncio
 import logging
 from enum import Enum
-from typing import List
+from typing import List, Tuple
 
+from ..fragment_cache import fragment_cache
 from .song import Fragment
 from .song import Playlist as PlaylistLoader
 from .song import Song
@@ -20,10 +22,17 @@ class Playlist:
     loopmode: LoopMode
     current_song: int
     current_fragment: int
+    streaming: bool
 
-    def __init__(self) -> None:
+    def __init__(self, streaming: bool = False) -> None:
+        """
+        Args:
+            streaming (bool): Whether fragments are streamed using get_stream instead of downloaded,
+                preloading then resolves the next song's stream instead of downloading its first fragment
+        """
         logger.info("New playlist initialized")
         self.songs = []
+        self.streaming = streaming
         self.loopmode = LoopMode.OFF
         self.current_song = 0
         self.current_fragment = 0
@@ -53,9 +62,45 @@ class Playlist:
         self._preload_next_fragment(
             song, self.current_fragment
         )  # This function figures out by it self whether to run another download or not
+        self._pin_active_songs()
+        await asyncio.to_thread(fragment_cache.touch, fragment.get_fragment_filepath())
         logger.debug("Returning fragment path")
         return fragment.get_fragment_filepath()
 
+    async def get_stream(self) -> Tuple[Fragment, str] | None:
+        """Returns the current fragment and the URL of its song's stream, or None if there is no song
+
+        Raises:
+            yt_dlp.utils.DownloadError: If the stream couldn't be resolved
+
+        Returns:
+            Tuple[Fragment, str]: The fragment to play and the stream to play it from
+            None: There is no song to play
+        """
+        logger.debug("Retrieving current stream")
+        if self.current_song >= len(self.songs):
+            logger.debug("Current song is out of range, returning None")
+            return None
+        song: Song = self.songs[self.current_song]
+        logger.debug("Waiting for current song to fetch metadata")
+        await song.wait_until_ready()
+        fragment: Fragment = song.fragments[self.current_fragment]
+        logger.debug("Waiting for current song's stream to resolve")
+        url = await song.meta.get_stream_url()
+        self._preload_next_fragment(song, self.current_fragment)
+        logger.debug("Returning stream")
+        return fragment, url
+
+    async def refresh_stream(self) -> None:
+        """Resolves the stream of the current song again, e.g. after its URL was revoked before it expired
+
+        Raises:
+            yt_dlp.utils.DownloadError: If the stream couldn't be resolved
+        """
+        if self.current_song >= len(self.songs):
+            return
+        await self.songs[self.current_song].meta.get_stream_url(refresh=True)
+
     async def next(self) -> None:
         logger.debug("Next fragment or song has been requested")
         if len(self.songs) == 0:
@@ -136,11 +181,26 @@ class Playlist:
             )
             self._preload_next_song()
             return
+        if self.streaming:
+            # Every fragment of a song is streamed from the same URL, there is nothing to preload
+            return
         logger.debug("Preloading fragment %d", current_fragment + 1)
         song.fragments[
             current_fragment + 1
         ].start_download_thread()  # This won't do anything if it's already downloaded or already in the process of downloading
 
+    def _pin_active_songs(self) -> None:
+        # The current song and the one being preloaded must never be evicted from the fragment cache
+        indices = [self.current_song, self.current_song + 1]
+        if self.loopmode == LoopMode.ALL:
+            indices[1] %= len(self.songs)
+        vids = [
+            getattr(self.songs[i].meta, "vid", None)
+            for i in indices
+            if i < len(self.songs) and self.songs[i].meta is not None
+        ]
+        fragment_cache.set_active(self, [vid for vid in vids if vid is not None])
+
     def _preload_next_song(self) -> None:
         logger.debug("Next song preload requested")
         song_count = len(self.songs)
@@ -149,12 +209,23 @@ class Playlist:
             logger.debug("Next song exists, will preload its first fragment")
             # If the next song exists
             song = self.songs[self.current_song + 1]
+            if self.streaming:
+                asyncio.create_task(self._preload_stream(song))
+                return
             self._preload_next_fragment(
                 song, -1
             )  # We are not using the current_fragment to access the current fragment in this function, so this is fine
             return
         logger.debug("Next song does not exist, will not preload")
 
+    async def _preload_stream(self, song: Song) -> None:
+        try:
+            await song.wait_until_ready()
+            await song.meta.get_stream_url()
+        except Exception as e:
+            # Resolving is retried once the song is played
+            logger.warning("Failed to preload the next song's stream", exc_info=e)
+
     async def add(self, url: str) -> None:
         logger.debug("Add job for %s requested", url)
         if "&list=" in url or "?list=" in url:
@@ -183,6 +254,7 @@ class Playlist:
             self.songs = [song for song in self.songs if song.meta.url != identifier]
 
     def clear(self) -> None:
+        fragment_cache.set_active(self, [])
         self.songs.clear()
         self.current_song = 0
         self.current_fragment = 0
@@ -2,74 +2,221 @@ import asyncio
 import json
 import logging
 import os
+import re
+import subprocess
+import tempfile
+import threading
+import time
 import urllib
-from typing import Dict, List
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
 
 import yt_dlp
-from yt_dlp.utils import download_range_func
-
-from ..threaded_executor import ThreadedExecutor, threaded
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+
+from ....config.music_config import (
+    CACHE_DIR,
+    MUSIC_FRAGMENT_GROWTH,
+    MUSIC_FRAGMENT_MAX,
+    MUSIC_FRAGMENT_MIN,
+    MUSIC_META_MAX_ENTRIES,
+    MUSIC_META_TTL_DAYS,
+    MUSIC_STREAM_TTL,
+    MUSIC_THROUGHPUT_ALPHA,
+)
+from ....database import get_session
+from ....database.models.music_meta import MusicMetaModel
+from ..fragment_cache import fragment_cache
+from ..threaded_executor import PLAYBACK_PRIORITY, ThreadedExecutor, threaded
 
 logger = logging.getLogger("strongest.song")
 
-CACHE_DIR = "./cache"
-
 
 def initialize_cache():
-    meta_file = CACHE_DIR + '/meta.json'
     if not os.path.exists(CACHE_DIR):
         try:
             os.makedirs(CACHE_DIR)
         except OSError as e:
             return
-    if not os.path.exists(meta_file):
-        try:
-            with open(meta_file, 'w') as f:
-                json.dump({}, f)
-        except OSError as e:
-            return
 
 initialize_cache()
 
-class MetaCache:
-    _cache: Dict
+# The only fields of yt-dlp's info which are used, everything else (formats, thumbnails, headers...) isn't cached
+_META_FIELDS = (
+    "id", "webpage_url", "original_url", "title", "channel", "uploader_url", "channel_url", "duration"
+)
 
-    def __init__(self) -> None:
-        self._cache = dict()
-        try:
-            self.load()
-        except FileNotFoundError:
-            self.save()
+# Eviction runs after this many inserts
+_EVICT_INTERVAL: int = 100
+
+
+def compact_info(info: Dict) -> Dict:
+    """Trims yt-dlp's info of a video or playlist down to the fields used by Meta and Playlist"""
+    if info.get("entries") is not None:
+        return {"entries": [compact_info(entry) for entry in info["entries"] if entry is not None]}
+    return {field: info[field] for field in _META_FIELDS if info.get(field) is not None}
+
+
+class MetaCache:
+    """Metadata of videos and playlists, stored in the bot's database.
+
+    Every lookup and insert touches a single row in its own session, so the cache can be used from worker threads.
+    Nothing is loaded up front, the meta.json file of older versions is imported on first use.
+    Entries expire `ttl` after they were fetched, and beyond `max_entries` the least recently used ones are evicted.
+    """
+    ttl: timedelta
+    max_entries: int
+    _migrated: bool
+    _inserts: int
+    _lock: threading.Lock
+
+    def __init__(self, ttl_days: int = MUSIC_META_TTL_DAYS, max_entries: int = MUSIC_META_MAX_ENTRIES) -> None:
+        self.ttl = timedelta(days=ttl_days)
+        self.max_entries = max_entries
+        self._migrated = False
+        self._inserts = 0
+        self._lock = threading.Lock()
 
     def _get_params(self, url: str) -> Dict:
         return urllib.parse.parse_qs(urllib.parse.urlparse(url).query)
 
-    def get(self, url: str, default: Dict | None = None) -> Dict | None:
+    def _get_id(self, url: str) -> str | None:
         params = self._get_params(url)
-        id = params.get("list", params.get("v", [None]))[0]
+        return params.get("list", params.get("v", [None]))[0]
+
+    def get(self, url: str, default: Dict | None = None) -> Dict | None:
+        id = self._get_id(url)
         if id is None:
             return default
-        return self._cache.get(id, default)
+        self._migrate()
+        now = datetime.now()
+        with get_session() as session:
+            cached: MusicMetaModel | None = session.get(MusicMetaModel, id)
+            if cached is None or cached.created < now - self.ttl:
+                return default
+            cached.accessed = now
+            return cached.data
 
     def set(self, url: str, data: Dict) -> None:
-        params = self._get_params(url)
-        id = params.get("list", params.get("v", [None]))[0]
+        id = self._get_id(url)
         if id is None:
             return None
-        self._cache[id] = data
-        self.save()
+        self._migrate()
+        now = datetime.now()
+        statement = insert(MusicMetaModel).values(id=id, data=compact_info(data), created=now, accessed=now)
+        statement = statement.on_conflict_do_update(
+            index_elements=[MusicMetaModel.id],
+            set_={"data": statement.excluded.data, "created": now, "accessed": now},
+        )
+        with get_session() as session:
+            session.execute(statement)
+        with self._lock:
+            self._inserts += 1
+            evict = self._inserts % _EVICT_INTERVAL == 0
+        if evict:
+            self.evict()
 
-    def save(self) -> None:
-        with open(f"{CACHE_DIR}/meta.json", "w") as f:
-            json.dump(self._cache, f)
+    def evict(self) -> int:
+        """Deletes expired entries and the least recently used ones beyond `max_entries`
 
-    def load(self) -> None:
-        with open(f"{CACHE_DIR}/meta.json", "r") as f:
-            self._cache = json.load(f)
+        Returns:
+            int: The number of deleted entries
+        """
+        with get_session() as session:
+            deleted = session.query(MusicMetaModel).filter(
+                MusicMetaModel.created < datetime.now() - self.ttl
+            ).delete(synchronize_session=False)
+            keep = (
+                select(MusicMetaModel.id)
+                .order_by(MusicMetaModel.accessed.desc())
+                .limit(self.max_entries)
+            )
+            deleted += session.query(MusicMetaModel).filter(
+                MusicMetaModel.id.not_in(keep)
+            ).delete(synchronize_session=False)
+        if deleted:
+            logger.info("Evicted %d entries from the metadata cache", deleted)
+        return deleted
+
+    def _migrate(self) -> None:
+        if self._migrated:
+            return
+        with self._lock:
+            if self._migrated:
+                return
+            meta_file = f"{CACHE_DIR}/meta.json"
+            try:
+                with open(meta_file, "r") as f:
+                    legacy: Dict = json.load(f)
+            except FileNotFoundError:
+                legacy = dict()
+            except (OSError, json.JSONDecodeError) as e:
+                logger.warning("Failed to import %s, starting with an empty cache: %s", meta_file, e)
+                legacy = dict()
+            if legacy:
+                logger.info("Importing %d cached entries from %s", len(legacy), meta_file)
+                now = datetime.now()
+                with get_session() as session:
+                    session.execute(
+                        insert(MusicMetaModel).on_conflict_do_nothing(),
+                        [
+                            {"id": id, "data": compact_info(data), "created": now, "accessed": now}
+                            for id, data in legacy.items()
+                        ],
+                    )
+                os.replace(meta_file, f"{meta_file}.migrated")
+            self._migrated = True
+        self.evict()
 
 
 meta_cache: MetaCache = MetaCache()
 
+# Stream URLs are resolved again this many seconds before they expire, so a download never starts on a dead URL
+_STREAM_EXPIRY_MARGIN: int = 60
+
+_YDL_STREAM_OPTS = {
+    "format": "bestaudio/best",
+    "nocheckcertificate": True,
+    "quiet": True,
+    "no_warnings": True,
+    "no_playlist": True,
+    "no_search": True,
+    "verbose": False,
+    "simulate": True,
+}
+
+
+class ForbiddenStreamError(Exception):
+    """The stream URL was rejected with 403 Forbidden"""
+
+
+class ResolvedStream:
+    """The direct URL of a song's audio stream, and until when it can be used"""
+    url: str
+    headers: Dict[str, str]
+    expires: float
+
+    def __init__(self, url: str, headers: Dict[str, str], expires: float) -> None:
+        self.url = url
+        self.headers = headers
+        self.expires = expires
+
+    @classmethod
+    def from_info(cls, info: Dict) -> "ResolvedStream | None":
+        """Takes the stream of the format yt-dlp selected, None if info doesn't contain one"""
+        url = info.get("url")
+        if url is None:
+            return None
+        # YouTube states the expiry as a unix timestamp in the URL
+        expire = urllib.parse.parse_qs(urllib.parse.urlparse(url).query).get("expire", [None])[0]
+        expires = float(expire) if expire is not None and expire.isdigit() else time.time() + MUSIC_STREAM_TTL
+        return cls(url, info.get("http_headers", dict()), expires)
+
+    def expired(self) -> bool:
+        return time.time() >= self.expires - _STREAM_EXPIRY_MARGIN
+
 
 class Meta:
     url: str
@@ -78,11 +225,17 @@ class Meta:
     channel_name: str
     channel_url: str
     _fetch_thread: ThreadedExecutor | None
+    _stream: ResolvedStream | None
+    _stream_lock: threading.Lock
+    _stream_thread: ThreadedExecutor | None
     _meta_injection: Dict | None
 
     def __init__(self, url: str, info: Dict | None = None) -> None:
         logger.info("Created SongMeta object for %s", url)
-        self._meta_injection = meta_cache.get(url, info)
+        self._meta_injection = info
+        self._stream = None
+        self._stream_lock = threading.Lock()
+        self._stream_thread = None
         self._fetch_thread = self._fetch_meta(url)
 
     async def wait_until_fetched(self) -> None:
@@ -98,6 +251,60 @@ class Meta:
         logger.debug("Someone is waiting for a song object to fetch meta data")
         await self._fetch_thread.wait()
 
+    @property
+    def stream_headers(self) -> Dict[str, str]:
+        """The HTTP headers to request the stream URL with"""
+        return dict() if self._stream is None else self._stream.headers
+
+    async def get_stream_url(self, refresh: bool = False) -> str:
+        """
+        Returns the direct URL of the song's audio stream, which FFmpeg can read from without downloading the song.
+
+        The URL is usually resolved by the metadata fetch already, and shared by every fragment of the song
+        until it expires. An expired or missing URL is resolved again in a worker thread.
+
+        Args:
+            refresh (bool): Resolve the stream even if it didn't expire yet, e.g. after FFmpeg was refused with a 403
+
+        Raises:
+            yt_dlp.utils.DownloadError: If the stream couldn't be resolved.
+
+        Returns:
+            str: The stream URL, request it with `stream_headers`
+        """
+        await self.wait_until_fetched()
+        stream = self._stream
+        if not refresh and stream is not None and not stream.expired():
+            return stream.url
+        # A resolve which is already running returns a new URL as well
+        if self._stream_thread is None or self._stream_thread.is_set():
+            logger.debug("Resolving the stream of %s", self.url)
+            self._stream_thread = self._resolve_stream(refresh)
+        stream = await self._stream_thread.get()
+        return stream.url
+
+    def get_stream(self, refresh: bool = False) -> ResolvedStream:
+        """
+        Returns the song's resolved stream, resolving it first if it expired. Blocks while resolving.
+
+        Args:
+            refresh (bool): Resolve the stream even if it didn't expire yet, e.g. after it was rejected with a 403
+
+        Raises:
+            yt_dlp.utils.DownloadError: If the stream couldn't be resolved.
+        """
+        with self._stream_lock:
+            stream = self._stream
+            if refresh or stream is None or stream.expired():
+                with yt_dlp.YoutubeDL(_YDL_STREAM_OPTS) as ydl:
+                    info = ydl.extract_info(self.url, download=False)
+                stream = ResolvedStream.from_info(info)
+                if stream is None:
+                    raise yt_dlp.utils.DownloadError(f"No stream URL found for {self.url}")
+                self._stream = stream
+                logger.info("Resolved the stream of %s", self.url)
+            return stream
+
     def get_fragment_dir(self) -> str:
         """
         Return the directory path for where the fragments of this song will be stored
@@ -107,6 +314,8 @@ class Meta:
     @threaded
     async def _fetch_meta(self, url) -> None:
         logger.info("Started fetching metadata for %s", url)
+        # Looked up here rather than in __init__, so the event loop doesn't wait for the database
+        self._meta_injection = meta_cache.get(url, self._meta_injection)
         if self._meta_injection is not None:
             logger.info("Metadata for %s appears to be injected", url)
             info = self._meta_injection
@@ -119,25 +328,19 @@ class Meta:
                     "channel_url", self.url
                 )
                 self.duration = info["duration"]
+                # Only present if the info was just extracted, e.g. as part of a playlist
+                self._stream = ResolvedStream.from_info(info)
                 logger.info("Finished injecting metadata for %s", url)
                 return
             except KeyError:
                 logger.error(
                     "Failed to inject metadata for %s, will retry using fetch", url
                 )
-        ydl_opts = {
-            "format": "bestaudio/best",
-            "nocheckcertificate": True,
-            "quiet": True,
-            "no_warnings": True,
-            "no_playlist": True,
-            "no_search": True,
-            "verbose": False,
-            "simulate": True,
-        }
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        with yt_dlp.YoutubeDL(_YDL_STREAM_OPTS) as ydl:
             info = ydl.extract_info(url, download=False)
-            self._meta_injection = info
+            self._meta_injection = compact_info(info)
+            # The selected format's stream comes with the metadata, fragments reuse it instead of extracting again
+            self._stream = ResolvedStream.from_info(info)
 
             self.vid = info["id"]
             self.url = info["webpage_url"]
@@ -150,20 +353,143 @@ class Meta:
         logger.info("Finished fetching metadata for %s", url)
         meta_cache.set(url, info)
 
+    @threaded(priority=PLAYBACK_PRIORITY)
+    async def _resolve_stream(self, refresh: bool = False) -> ResolvedStream:
+        return self.get_stream(refresh)
+
+
+# Fragments of the fixed plan used by older versions, named by their index instead of their range
+LEGACY_FRAGMENT_SIZE: int = 200 # 3 Minutes and 20 Seconds
+
+# Only plan fragments which download in at most this fraction of the previous fragment's playback
+_THROUGHPUT_MARGIN: float = 0.5
+
+_RANGE_NAME = re.compile(r"^(\d+)-(\d+)$")
+
+
+class ThroughputEstimator:
+    """Exponentially weighted moving average of the download speed, in seconds of audio per second"""
+    alpha: float
+    _speed: float | None
+    _lock: threading.Lock
+
+    def __init__(self, alpha: float = MUSIC_THROUGHPUT_ALPHA) -> None:
+        self.alpha = alpha
+        self._speed = None
+        self._lock = threading.Lock()
+
+    @property
+    def speed(self) -> float | None:
+        """The average speed, or None until the first download finished"""
+        return self._speed
+
+    def update(self, audio_seconds: float, elapsed: float) -> None:
+        if audio_seconds <= 0 or elapsed <= 0:
+            return
+        speed = audio_seconds / elapsed
+        with self._lock:
+            if self._speed is None:
+                self._speed = speed
+            else:
+                self._speed = self.alpha * speed + (1 - self.alpha) * self._speed
+
+
+throughput: ThroughputEstimator = ThroughputEstimator()
+
+
+def plan_fragments(
+    duration: int,
+    cached: List[Tuple[int, int]] | None = None,
+    speed: float | None = None,
+    first: int = MUSIC_FRAGMENT_MIN,
+    cap: int = MUSIC_FRAGMENT_MAX,
+    growth: float = MUSIC_FRAGMENT_GROWTH,
+) -> List[Tuple[int, int]]:
+    """
+    Splits a song into fragments, a short one first so playback starts quickly, then growing ones.
+
+    Each fragment is `growth` times longer than the previous one, up to `cap` seconds. If the download speed is known,
+    a fragment is also kept short enough to download while the previous one plays.
+    The ranges depend on the download speed, so cached ranges are kept as they are, wherever they start, and only the
+    gaps between them are planned. Otherwise a later plan would miss every cached fragment of an earlier one.
+
+    Args:
+        duration (int): The song's duration in seconds
+        cached (List[Tuple[int, int]]): Ranges which are already cached, overlapping ones are skipped
+        speed (float | None): The download speed in seconds of audio per second, if known
+
+    Returns:
+        List[Tuple[int, int]]: The start and end of every fragment, in seconds
+    """
+    kept: List[Tuple[int, int]] = []
+    for start, end in sorted(cached or []):
+        if start >= (kept[-1][1] if kept else 0) and start < end <= duration:
+            kept.append((start, end))
+    plan: List[Tuple[int, int]] = []
+    start = 0
+    length = first
+    while start < duration:
+        if kept and kept[0][0] == start:
+            plan.append(kept.pop(0))
+            start, length = plan[-1][1], plan[-1][1] - plan[-1][0]
+            continue
+        if plan:
+            next_length = length * growth
+            if speed is not None:
+                next_length = min(next_length, length * speed * _THROUGHPUT_MARGIN)
+            length = int(max(first, min(cap, next_length)))
+        # Planned fragments end where the next cached one starts
+        limit = kept[0][0] if kept else duration
+        end = min(start + length, limit)
+        if limit - end < first:
+            end = limit  # A short tail is merged into the fragment before it
+        plan.append((start, end))
+        start = end
+    return plan
+
+
+def legacy_plan(duration: int) -> List[Tuple[int, int]]:
+    """The fixed plan of older versions, LEGACY_FRAGMENT_SIZE long fragments with the tail merged into the last one"""
+    plan: List[Tuple[int, int]] = []
+    start = 0
+    while start < duration:
+        end = min(start + LEGACY_FRAGMENT_SIZE, duration)
+        if plan and end - plan[-1][1] < LEGACY_FRAGMENT_SIZE:
+            plan[-1] = (plan[-1][0], end)
+        else:
+            plan.append((start, end))
+        start = end
+    return plan
+
+# Downloads by fragment file, shared by every playlist so the same fragment is never downloaded twice at once
+_downloads: Dict[str, ThreadedExecutor] = dict()
+
+# The fragment ranges of recently planned videos and whether they're legacy ones. Every song of a video reuses its
+# plan, so songs queued while another one's fragments are still downloading ask for the same files.
+_plans: "OrderedDict[str, Tuple[List[Tuple[int, int]], bool]]" = OrderedDict()
+_PLAN_CACHE_SIZE: int = 256
+
 
 class Fragment:
     fid: int
     start: int
     end: int
     meta: Meta
+    file_name: str
     _download_thread: ThreadedExecutor | None
 
-    def __init__(self, meta: Meta, fid: int, start: int, end: int) -> None:
+    def __init__(self, meta: Meta, fid: int, start: int, end: int, legacy: bool = False) -> None:
+        """
+        Args:
+            legacy (bool): Whether the fragment belongs to the fixed plan of older versions,
+                whose files are named by the fragment's index instead of its range
+        """
         logger.debug("Created fragment from %d to %d for %s", start, end, meta.url)
         self.meta = meta
         self.fid = fid
         self.start = start
         self.end = end
+        self.file_name = str(fid) if legacy else f"{start}-{end}"
         self._download_thread = None
 
     def is_downloaded(self) -> bool:
@@ -204,16 +530,26 @@ class Fragment:
                 return
             if self.is_downloaded():
                 return
+        path = self.get_fragment_filepath()
+        in_flight = _downloads.get(path)
+        if in_flight is not None and not in_flight.is_set():
+            # Another playlist, e.g. in another guild, is already downloading this fragment, wait for it instead
+            logger.debug("Joining the download job for a fragment of %s", self.meta.url)
+            self._download_thread = in_flight
+            return
         logger.debug("Creating download job for a fragment of %s", self.meta.url)
+        for finished in [key for key, download in _downloads.items() if download.is_set()]:
+            del _downloads[finished]
         self._download_thread = self._download()
+        _downloads[path] = self._download_thread
 
     def get_fragment_filepath(self) -> str:
         """
         Return the file path for the fragment file
         """
-        return f"{self.meta.get_fragment_dir()}/{self.fid}"
+        return f"{self.meta.get_fragment_dir()}/{self.file_name}"
 
-    @threaded
+    @threaded(priority=PLAYBACK_PRIORITY)
     async def _download(self) -> None:
         if self.is_downloaded():
             logger.debug(
@@ -229,23 +565,16 @@ class Fragment:
             self.end,
             self.meta.url,
         )
-        yt_opts = {
-            "format": "bestaudio/best",
-            "outtmpl": self.get_fragment_filepath(),
-            "extractaudio": True,
-            "audioformat": "webm",
-            "nocheckcertificate": True,
-            "quiet": True,
-            "no_warnings": True,
-            "no_playlist": True,
-            "no_search": True,
-            "verbose": False,
-            "download_ranges": download_range_func(None, [(self.start, self.end)]),
-            "force_keyframes_at_cuts": True,
-        }
-
-        with yt_dlp.YoutubeDL(yt_opts) as ydl:
-            ydl.download(self.meta.url)
+        stream = self.meta.get_stream()
+        started = time.monotonic()
+        try:
+            self._download_range(stream)
+        except ForbiddenStreamError:
+            # The URL was revoked before it expired, resolve it again and retry once
+            logger.info("Stream of %s was rejected, resolving it again", self.meta.url)
+            self._download_range(self.meta.get_stream(refresh=True))
+        throughput.update(self.end - self.start, time.monotonic() - started)
+        fragment_cache.add(self.get_fragment_filepath())
         logger.debug(
             "Finished download of fragment %d to %d of %s",
             self.start,
@@ -253,6 +582,36 @@ class Fragment:
             self.meta.url,
         )
 
+    def _download_range(self, stream: ResolvedStream) -> None:
+        # FFmpeg seeks within the stream using range requests, so only the fragment itself is downloaded
+        headers = "".join(f"{key}: {value}\r\n" for key, value in stream.headers.items())
+        command = [
+            "ffmpeg", "-nostdin", "-loglevel", "error", "-y",
+            "-reconnect", "1", "-reconnect_delay_max", "5",
+            *(["-headers", headers] if headers else []),
+            "-ss", str(self.start), "-t", str(self.end - self.start),
+            "-i", stream.url,
+            # Audio is copied as is, matroska can hold whichever codec the stream uses
+            "-vn", "-c", "copy", "-f", "matroska",
+        ]
+        os.makedirs(self.meta.get_fragment_dir(), exist_ok=True)
+        # Written to a temporary file first and renamed once complete, so nobody ever reads a partial fragment
+        handle, temp_path = tempfile.mkstemp(dir=self.meta.get_fragment_dir(), suffix=".tmp")
+        os.close(handle)
+        try:
+            result = subprocess.run([*command, temp_path], capture_output=True, text=True)
+            if result.returncode == 0:
+                os.replace(temp_path, self.get_fragment_filepath())
+                return
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        if "403" in result.stderr:
+            raise ForbiddenStreamError(result.stderr.strip())
+        raise RuntimeError(
+            f"FFmpeg failed to download {self.start} to {self.end} of {self.meta.url}: {result.stderr.strip()}"
+        )
+
 
 class Song:
     meta: Meta
@@ -283,22 +642,41 @@ class Song:
         logger.debug("Fragments created")
 
     def _create_fragments(self) -> None:
+        vid = self.meta.vid
+        planned = _plans.get(vid)
+        if planned is None:
+            planned = self._plan_fragments()
+        _plans[vid] = planned
+        _plans.move_to_end(vid)
+        while len(_plans) > _PLAN_CACHE_SIZE:
+            _plans.popitem(last=False)
+        plan, legacy = planned
+        self.fragments = [
+            Fragment(self.meta, fid, start, end, legacy=legacy) for fid, (start, end) in enumerate(plan)
+        ]
+
+    def _plan_fragments(self) -> Tuple[List[Tuple[int, int]], bool]:
         duration = int(self.meta.duration)
-        start = 0
-        fragments = []
-
-        FRAGMENT_SIZE: int = 200 # 3 Minutes and 20 Seconds
-
-        while start < duration:
-            end = min(start + FRAGMENT_SIZE, duration)
-            if len(fragments) > 0 and end - fragments[-1].end < FRAGMENT_SIZE:
-                fragments[-1].end = end
-            else:
-                fragments.append(Fragment(self.meta, len(fragments), start, end))
-            start = end
-
-        self.fragments = fragments
-
+        fragment_dir = self.meta.get_fragment_dir()
+        try:
+            cached_files = os.listdir(fragment_dir)
+        except FileNotFoundError:
+            cached_files = []
+
+        # Files of the fixed plan of older versions are named by their index, keep using that plan for as long as any
+        # of them is cached, so they stay valid
+        if any(name.isdigit() for name in cached_files):
+            logger.debug("Found legacy fragments, using the fixed plan")
+            return legacy_plan(duration), True
+
+        cached = [
+            (int(match.group(1)), int(match.group(2)))
+            for match in map(_RANGE_NAME.match, cached_files)
+            if match is not None
+        ]
+        plan = plan_fragments(duration, cached, throughput.speed)
+        logger.debug("Planned %d fragments: %s", len(plan), plan)
+        return plan, False
 
 class Playlist:
     url: str
@@ -1,3 +1,4 @@
+import asyncio
 from typing import Dict, List
 
 import discord
@@ -6,6 +7,8 @@ from discord.ext import commands
 from ..services.audiocontroller import AudioController
 from ..models.playlist import LoopMode, Playlist
 from ..embed_factory import create_embed
+from ..fragment_cache import fragment_cache
+from ..threaded_executor import get_pool
 
 
 class Default(commands.Cog):
@@ -163,6 +166,20 @@ class Default(commands.Cog):
                 )
         # Loop mode
         data.append("Loop: " + f"`{playlist.loopmode.name.title()}`")
+        # Worker pool
+        pool = get_pool()
+        data.append(
+            "Workers: "
+            + f"[running: `{pool.running}`/`{pool.size}`] "
+            + f"[queued: `{pool.queued}`, peak `{pool.peak_queued}`] "
+            + f"[done: `{pool.completed}`, failed `{pool.failed}`]"
+        )
+        # Fragment cache, the first access scans the cache directory
+        cached_bytes = await asyncio.to_thread(lambda: fragment_cache.total_bytes)
+        data.append(
+            "Fragment Cache: "
+            + f"`{cached_bytes / 2**20:.1f}`/`{fragment_cache.max_bytes / 2**20:.1f}` MiB"
+        )
 
         # Send response
         await ctx.reply(
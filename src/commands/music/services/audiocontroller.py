@@ -1,15 +1,21 @@
 import asyncio
 import logging
-from typing import List, Tuple
+import shlex
+import tempfile
+from typing import IO, List, Tuple
 
 import discord
 from discord.ext import commands
 
+from ....config.music_config import MUSIC_PLAYBACK_MODE
 from ..models.playlist import Playlist
 from ..models.song import Fragment
 
 logger = logging.getLogger("strongest.audiocontroller")
 
+# Streams are read over HTTP, which may drop in the middle of a fragment
+_STREAM_BEFORE_OPTIONS = "-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5"
+
 
 class AudioController:
     bot: commands.Bot
@@ -19,15 +25,20 @@ class AudioController:
     _playlist: Playlist
     _finished_playing: asyncio.Event | None
     _play_task: asyncio.Task | None
+    _stream_log: IO[bytes] | None
+    _stream_retried: bool
     __loop: asyncio.AbstractEventLoop
 
     def __init__(self, bot: commands.Bot, guild: discord.Guild) -> None:
         logger.info("Initialized AudioController for %s (%d)", guild.name, guild.id)
         self.bot = bot
         self.guild = guild
-        self._playlist = Playlist()
+        self._playlist = Playlist(streaming=MUSIC_PLAYBACK_MODE == "stream")
         self._finished_playing = None
         self._play_task = None
+        # FFmpeg's errors for the fragment being streamed, and whether it was already replayed after a 403
+        self._stream_log = None
+        self._stream_retried = False
         self.__loop = asyncio.get_running_loop()
 
         self._callback_channel = None
@@ -164,11 +175,24 @@ class AudioController:
         logger.debug("New play task started")
         if self._finished_playing is None:
             self._finished_playing = asyncio.Event()
+        failures = 0
         while 1:
             self._finished_playing.clear()
             logger.debug("Retrieving fragment")
-            frag_path: str | None = await self._playlist.get()
-            if frag_path is None:
+            try:
+                source: discord.AudioSource | None = await self._get_source()
+            except Exception as e:
+                failures += 1
+                if failures > len(self._playlist.songs):
+                    # Every song failed, e.g. the stream of the looped song keeps failing to resolve
+                    logger.error("Failed to retrieve the current fragment, stopping", exc_info=e)
+                    await self._cleanup()
+                    return
+                logger.error("Failed to retrieve the current fragment, skipping the song", exc_info=e)
+                self._playlist.skip()
+                continue
+            failures = 0
+            if source is None:
                 try:
                     logger.debug("Fragment is none, returning")
                     return
@@ -176,18 +200,73 @@ class AudioController:
                     logger.debug("Fragment was none, calling cleanup")
                     await self._cleanup()
             # await self._announce_current_song() #! Broken asf, announcing by fragment instead of song
-            # TODO: Maybe we can use PCMAudio to read from a buffer instead of a file?
             logger.debug("Starting audio playback")
             self._vc.play(
-                discord.FFmpegPCMAudio(frag_path),
+                source,
                 after=lambda _: asyncio.run_coroutine_threadsafe(
-                    self._next(), self.__loop
+                    self._after_fragment(), self.__loop
                 ).result(),
             )
             logger.debug("Waiting until fragment playback finishes")
             await self._finished_playing.wait()
             logger.debug("Fragment playback finished!")
 
+    async def _get_source(self) -> discord.AudioSource | None:
+        """Returns the audio of the current fragment, or None if there is nothing left to play
+
+        In stream mode FFmpeg seeks to the fragment within the song's stream and pipes it to the voice client,
+        so playback starts without waiting for the fragment to download.
+        """
+        if not self._playlist.streaming:
+            frag_path: str | None = await self._playlist.get()
+            return None if frag_path is None else discord.FFmpegPCMAudio(frag_path)
+        stream = await self._playlist.get_stream()
+        if stream is None:
+            return None
+        fragment, url = stream
+        headers = "".join(f"{key}: {value}\r\n" for key, value in fragment.meta.stream_headers.items())
+        self._close_stream_log()
+        self._stream_log = tempfile.TemporaryFile()
+        return discord.FFmpegPCMAudio(
+            url,
+            before_options=f"{_STREAM_BEFORE_OPTIONS} -ss {fragment.start}"
+            + (f" -headers {shlex.quote(headers)}" if headers else ""),
+            options=f"-vn -t {fragment.end - fragment.start}",
+            stderr=self._stream_log,  # type: ignore
+        )
+
+    def _stream_rejected(self) -> bool:
+        # FFmpeg exits without playing anything when the stream URL is refused
+        if self._stream_log is None:
+            return False
+        self._stream_log.seek(0)
+        return b"403" in self._stream_log.read()
+
+    def _close_stream_log(self) -> None:
+        if self._stream_log is not None:
+            self._stream_log.close()
+            self._stream_log = None
+
+    async def _after_fragment(self) -> None:
+        """Called once a fragment stops playing. Moves on using `_next`, unless the fragment's stream was refused.
+
+        A stream URL can be revoked before it expires, in which case FFmpeg is refused with a 403 and every following
+        fragment of the song would fail the same way. The stream is resolved again and the fragment replayed, once.
+        """
+        if self._stream_rejected() and not self._stream_retried:
+            self._stream_retried = True
+            logger.info("Stream of the current song was rejected, resolving it again")
+            try:
+                if self._play_task is None or self._play_task.cancelled():
+                    return
+                await self._playlist.refresh_stream()
+                self._finished_playing.set()
+                return
+            except Exception as e:
+                logger.error("Failed to resolve the stream again, moving on", exc_info=e)
+        self._stream_retried = False
+        await self._next()
+
     async def _next(self) -> None:
         """Asynchronously moves the current song to the next item in the playlist and unblocks the audio playback process. (Blocked event-wise)
 
@@ -224,4 +303,6 @@ class AudioController:
             self._vc.stop()
         self._finished_playing.set()
         self._play_task = None
+        self._close_stream_log()
+        self._stream_retried = False
         logger.debug("Finished cleanup")
\ No newline at end of file
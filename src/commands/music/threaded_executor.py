@@ -1,27 +1,128 @@
-import threading
 import asyncio
-from typing import Any, Coroutine, Callable
+import itertools
+import logging
+import queue
+import threading
+from typing import Any, Callable, Coroutine, List, Tuple
+
+from ...config.music_config import MUSIC_WORKERS
+
+logger = logging.getLogger("strongest.executor")
+
+# Lower runs first. Playback waits on stream resolution and fragment downloads, so those must not queue up
+# behind the metadata fetches of a large playlist.
+PLAYBACK_PRIORITY: int = 0
+DEFAULT_PRIORITY: int = 1
+
+
+class WorkerPool:
+    """A fixed number of worker threads, each running its own long-lived event loop.
+
+    Jobs wait in a queue until a worker is free, so no matter how many jobs are submitted at once,
+    at most `size` of them run at the same time. Waiting jobs run by priority, then in the order they were submitted.
+    """
+    size: int
+    completed: int
+    failed: int
+    peak_queued: int
+    _queue: "queue.PriorityQueue[Tuple[int, int, ThreadedExecutor]]"
+    _sequence: "itertools.count[int]"
+    _threads: List[threading.Thread]
+    _running: int
+    _lock: threading.Lock
+
+    def __init__(self, size: int = MUSIC_WORKERS) -> None:
+        self.size = size
+        self.completed = 0
+        self.failed = 0
+        self.peak_queued = 0
+        self._queue = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._threads = []
+        self._running = 0
+        self._lock = threading.Lock()
+
+    @property
+    def queued(self) -> int:
+        """The number of jobs waiting for a free worker"""
+        return self._queue.qsize()
+
+    @property
+    def running(self) -> int:
+        """The number of jobs being run right now"""
+        return self._running
+
+    def submit(self, executor: "ThreadedExecutor", priority: int = DEFAULT_PRIORITY) -> None:
+        # Workers are started on first use
+        if not self._threads:
+            with self._lock:
+                if not self._threads:
+                    self._threads = [
+                        threading.Thread(target=self._work, name=f"music-worker-{i}", daemon=True)
+                        for i in range(self.size)
+                    ]
+                    for thread in self._threads:
+                        thread.start()
+        # The sequence number keeps jobs of the same priority in order, executors themselves aren't comparable
+        self._queue.put((priority, next(self._sequence), executor))
+        queued = self._queue.qsize()
+        if queued > self.peak_queued:
+            self.peak_queued = queued
+        logger.debug("Job queued, %d waiting, %d running", queued, self._running)
+
+    def _work(self) -> None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        while True:
+            _, _, executor = self._queue.get()
+            with self._lock:
+                self._running += 1
+            result: Any | None = None
+            exception: BaseException | None = None
+            try:
+                result = loop.run_until_complete(executor._coro)
+            except BaseException as e:
+                # Raised again by ThreadedExecutor.get(), but jobs which nobody gets would fail silently otherwise
+                logger.error("Threaded job failed", exc_info=e)
+                exception = e
+            with self._lock:
+                self._running -= 1
+                if exception is None:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+            executor._finish(result, exception)
+
+
+_pool: WorkerPool = WorkerPool()
+
+
+def get_pool() -> WorkerPool:
+    """Returns the worker pool shared by every threaded job"""
+    return _pool
+
 
-# ? This might be needless-ly complicated. If this still sucks, there is an alternative solution in my chatgpt history
 class ThreadedExecutor:
-    _thread: threading.Thread
     _event: asyncio.Event
     _coro: Coroutine
     _loop: asyncio.AbstractEventLoop
     _result: Any | None
+    _exception: BaseException | None
 
-    def __init__(self, coro: Coroutine) -> None:
+    def __init__(self, coro: Coroutine, priority: int = DEFAULT_PRIORITY) -> None:
         self._event = asyncio.Event()
         self._coro = coro
         self._loop = asyncio.get_event_loop()
-        self._thread = threading.Thread(target=lambda: asyncio.run(self._run()))
-        self._thread.start()
+        self._result = None
+        self._exception = None
+        _pool.submit(self, priority)
 
     async def wait(self) -> None:
         """
         Wait for the event to be set.
 
-        This function is used to wait for the thread to finish. Execution will resume once the thread has finished.
+        This function is used to wait for the job to finish. Execution will resume once the job has finished,
+        whether it succeeded or not.
 
         Returns:
             None: This function does not return any value.
@@ -31,40 +132,54 @@ class ThreadedExecutor:
 
     def is_set(self) -> bool:
         """
-        Check if the thread has finished.
+        Check if the job has finished.
 
         Returns:
             bool: True if the event is set, False otherwise.
         """
         return self._event.is_set()
 
+    def failed(self) -> bool:
+        """
+        Check if the job has finished by raising an exception.
+
+        Returns:
+            bool: True if the coroutine raised, False if it succeeded or is still running.
+        """
+        return self._exception is not None
+
     async def get(self) -> Any:
         """
         Asynchronously gets the result once it is avabiable.
+
+        Raises:
+            BaseException: Whatever the coroutine raised, if it failed.
+
         Returns:
             Any: The result.
         """
         await self.wait()
+        if self._exception is not None:
+            raise self._exception
         return self._result
 
-    async def _complete(self):
-        self._event.set()
+    def _finish(self, result: Any | None, exception: BaseException | None) -> None:
+        # Called from the worker thread, the event belongs to the loop which created the job
+        self._result = result
+        self._exception = exception
+        self._loop.call_soon_threadsafe(self._event.set)
 
-    async def _run(self) -> None:
-        try:
-            self._result = await self._coro
-        finally:
-            asyncio.run_coroutine_threadsafe(self._complete(), self._loop)
 
-
-def threaded(func: Coroutine) -> Callable[[Any, Any], ThreadedExecutor]:
+def threaded(func: Coroutine | None = None, *, priority: int = DEFAULT_PRIORITY) -> Any:
     """
     Decorator that wraps a coroutine function in a ThreadedExecutor.
 
-    ! NOTE: The function runs in a seperate event loop, awaits and event sets might not behave as expected
+    ! NOTE: The function runs in a worker thread's event loop, awaits and event sets might not behave as expected.
+    ! Jobs share a pool of MUSIC_WORKERS threads, a job which blocks holds up a worker until it is done.
 
     Args:
         func (Coroutine): The coroutine function to be wrapped.
+        priority (int): The priority of its jobs, use `@threaded(priority=PLAYBACK_PRIORITY)` for playback.
 
     Returns:
         Callable[[Any, Any], ThreadedExecutor]: A wrapper function that takes any number of positional and keyword arguments and returns a ThreadedExecutor object.
@@ -75,10 +190,13 @@ def threaded(func: Coroutine) -> Callable[[Any, Any], ThreadedExecutor]:
             # Coroutine code here
 
         executor = my_coroutine()
-        # Use the executor to run the coroutine in a separate thread
+        # Use the executor to run the coroutine in a worker thread
     """
 
-    def wrapper(*args, **kwargs) -> ThreadedExecutor:
-        return ThreadedExecutor(func(*args, **kwargs))
+    def decorate(func: Coroutine) -> Callable[[Any, Any], ThreadedExecutor]:
+        def wrapper(*args, **kwargs) -> ThreadedExecutor:
+            return ThreadedExecutor(func(*args, **kwargs), priority)  # type: ignore
+
+        return wrapper
 
-    return wrapper
\ No newline at end of file
+    return decorate if func is None else decorate(func)
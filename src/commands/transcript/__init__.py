@@ -0,0 +1 @@
+from .cog import Transcripts, setup
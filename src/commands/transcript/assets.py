@@ -0,0 +1,225 @@
+"""Local mirror for transcript avatars and attachments
+
+Discord's CDN URLs expire, which breaks the images of older transcripts. When mirroring is enabled, every avatar and
+attachment is downloaded once into a content-addressed cache (`<sha256>.<ext>`), and transcripts reference the
+cached copy instead. The cache is shared by all transcripts, so an avatar which appears thousands of times is still
+only downloaded and stored once.
+
+Cached files are referenced as `TRANSCRIPT_ASSET_BASE_URL/<file>`. The default base URL is relative, and resolves
+correctly for transcripts stored in the archive directory. Transcripts which are sent get a copy of the assets they
+reference under the same relative path, see `copy_referenced`. Point the base URL at a web server serving the cache
+directory to reference the mirrored assets there instead.
+
+Assets which fail to download, or are too large, are remembered for TRANSCRIPT_ASSET_RETRY_AFTER seconds, so they
+aren't requested again for every message that references them.
+
+Classes:
+    AssetMirror: Downloads assets into the content-addressed cache, resolves their references and copies them out.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import time
+from typing import Dict, Iterable, List, Set
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from ...config.transcript_config import (
+    TRANSCRIPT_ASSET_BASE_URL,
+    TRANSCRIPT_ASSET_CONCURRENCY,
+    TRANSCRIPT_ASSET_DIR,
+    TRANSCRIPT_ASSET_MAX_BYTES,
+    TRANSCRIPT_ASSET_RETRY_AFTER,
+)
+
+logger: logging.Logger = logging.getLogger("Eternal.Main")
+
+_CHUNK_SIZE: int = 64 * 1024
+
+
+def _asset_key(url: str) -> str:
+    # Discord signs CDN URLs with query parameters which change over time, the path identifies the file
+    parts = urlsplit(url)
+    return f"{parts.netloc}{parts.path}"
+
+
+class AssetMirror:
+    cache_dir: str
+    base_url: str
+    max_bytes: int
+    retry_after: float
+    _index: Dict[str, str] | None
+    _failed: Dict[str, float]
+    _reference: re.Pattern
+    _in_flight: Dict[str, asyncio.Task]
+    _semaphore: asyncio.Semaphore
+    _session: aiohttp.ClientSession | None
+    _owns_session: bool
+
+    def __init__(
+        self,
+        cache_dir: str = TRANSCRIPT_ASSET_DIR,
+        base_url: str = TRANSCRIPT_ASSET_BASE_URL,
+        concurrency: int = TRANSCRIPT_ASSET_CONCURRENCY,
+        max_bytes: int = TRANSCRIPT_ASSET_MAX_BYTES,
+        retry_after: float = TRANSCRIPT_ASSET_RETRY_AFTER,
+        session: aiohttp.ClientSession | None = None,
+    ) -> None:
+        self.cache_dir = cache_dir
+        self.base_url = base_url.rstrip("/")
+        self.max_bytes = max_bytes
+        self.retry_after = retry_after
+        self._index = None
+        # Asset key -> when to try downloading it again
+        self._failed = dict()
+        # Matches the references written by resolve, the file name is a sha256 digest and an extension
+        self._reference = re.compile(re.escape(self.base_url) + r"/([0-9a-f]{64}(?:\.[^\s\"'()<>/\\]{0,15})?)")
+        self._in_flight = dict()
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._session = session
+        self._owns_session = session is None
+
+    @property
+    def relative(self) -> bool:
+        """Whether references are relative paths, which only resolve next to a copy of the referenced assets"""
+        parts = urlsplit(self.base_url)
+        return not parts.scheme and not parts.netloc and not self.base_url.startswith("/")
+
+    async def close(self) -> None:
+        if self._owns_session and self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def resolve(self, url: str) -> str:
+        """Returns the reference to the mirrored copy of an asset, downloading it if it isn't cached yet.
+
+        Concurrent calls for the same asset share a single download.
+        If the asset can't be downloaded, the original URL is returned instead.
+
+        Args:
+            url (str): The asset's URL
+
+        Returns:
+            str: The reference to use in the transcript
+        """
+        index = self._load_index()
+        key = _asset_key(url)
+        file_name = index.get(key)
+        if file_name is None:
+            retry_at = self._failed.get(key)
+            if retry_at is not None:
+                if time.monotonic() < retry_at:
+                    return url
+                del self._failed[key]
+            task = self._in_flight.get(key)
+            if task is None:
+                task = asyncio.create_task(self._download(key, url))
+                self._in_flight[key] = task
+                task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+            file_name = await task
+        if file_name is None:
+            self._failed[key] = time.monotonic() + self.retry_after
+            return url
+        return f"{self.base_url}/{file_name}"
+
+    async def resolve_all(self, urls: Iterable[str]) -> Dict[str, str]:
+        """Resolves several assets concurrently, returning a mapping of each URL to its reference"""
+        urls = list(dict.fromkeys(urls))
+        references = await asyncio.gather(*(self.resolve(url) for url in urls))
+        return dict(zip(urls, references))
+
+    def referenced_files(self, path: str) -> Set[str]:
+        """Returns the cached files a transcript references. Blocks while reading the transcript."""
+        files: Set[str] = set()
+        with open(path, "r", encoding="utf-8") as file:
+            for line in file:
+                files.update(self._reference.findall(line))
+        return {file for file in files if os.path.exists(os.path.join(self.cache_dir, file))}
+
+    def copy_referenced(self, paths: List[str], directory: str) -> List[str]:
+        """Copies the cached files which transcripts reference to where their relative references point.
+        Blocks while copying.
+
+        Args:
+            paths (List[str]): The transcripts, each of which is in `directory`
+            directory (str): The directory the references are relative to
+
+        Returns:
+            List[str]: The paths of the copies, including those which were copied for an earlier transcript
+        """
+        if not self.relative:
+            return []
+        asset_dir = os.path.normpath(os.path.join(directory, self.base_url))
+        if os.path.relpath(asset_dir, directory).startswith(os.pardir):
+            logger.warning("Not copying assets outside of %s, base URL %s", directory, self.base_url)
+            return []
+        os.makedirs(asset_dir, exist_ok=True)
+        copies: List[str] = []
+        for file in set().union(*(self.referenced_files(path) for path in paths)):
+            copy = os.path.join(asset_dir, file)
+            # Assets are content-addressed, a file which exists already is the same asset
+            if not os.path.exists(copy):
+                shutil.copyfile(os.path.join(self.cache_dir, file), copy)
+            copies.append(copy)
+        return copies
+
+    def _load_index(self) -> Dict[str, str]:
+        # The index is an append-only log of which file each asset was saved as, loaded on first use
+        if self._index is not None:
+            return self._index
+        self._index = dict()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        try:
+            with open(os.path.join(self.cache_dir, "index.jsonl"), "r", encoding="utf-8") as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Partially written line, the asset is downloaded again if needed
+                    if os.path.exists(os.path.join(self.cache_dir, entry["file"])):
+                        self._index[entry["key"]] = entry["file"]
+        except FileNotFoundError:
+            pass
+        return self._index
+
+    async def _download(self, key: str, url: str) -> str | None:
+        if self._session is None:
+            self._session = aiohttp.ClientSession()
+        async with self._semaphore:
+            digest = hashlib.sha256()
+            handle, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".part")
+            try:
+                size = 0
+                with os.fdopen(handle, "wb") as file:
+                    async with self._session.get(url) as response:
+                        response.raise_for_status()
+                        if response.content_length is not None and response.content_length > self.max_bytes:
+                            logger.info("Not mirroring %s, it's larger than %d bytes", url, self.max_bytes)
+                            return None
+                        async for chunk in response.content.iter_chunked(_CHUNK_SIZE):
+                            size += len(chunk)
+                            if size > self.max_bytes:
+                                logger.info("Not mirroring %s, it's larger than %d bytes", url, self.max_bytes)
+                                return None
+                            digest.update(chunk)
+                            file.write(chunk)
+                extension = os.path.splitext(urlsplit(url).path)[1][:16]
+                file_name = f"{digest.hexdigest()}{extension}"
+                # Identical content is only stored once, no matter how many URLs point to it
+                os.replace(temp_path, os.path.join(self.cache_dir, file_name))
+            except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+                logger.warning("Failed to mirror %s: %s", url, e)
+                return None
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+        self._index[key] = file_name  # type: ignore
+        with open(os.path.join(self.cache_dir, "index.jsonl"), "a", encoding="utf-8") as file:
+            file.write(json.dumps({"key": key, "file": file_name}) + "\n")
+        return file_name
@@ -0,0 +1,116 @@
+"""Compressed transcript bundles
+
+Transcripts are packed into as few zip archives as possible, each of which fits under the upload limit.
+Every file is compressed only once: its volume is picked using an estimate from compressing a sample of it,
+and the space it actually took up is read back from the archive afterwards.
+A volume which still ends up over the limit, e.g. one holding a transcript which doesn't fit on its own even compressed,
+is split into numbered parts (`name.zip.001`, `name.zip.002`, ...), which can be joined back together with `cat` or
+7-Zip.
+
+Functions:
+    bundle_transcripts: Packs transcripts into zip volumes which fit under the upload limit.
+"""
+import math
+import os
+import zipfile
+import zlib
+from typing import Dict, List
+
+from ...config.transcript_config import TRANSCRIPT_COMPRESSION_LEVEL, TRANSCRIPT_UPLOAD_LIMIT
+
+_CHUNK_SIZE: int = 1024 * 1024
+# How much of a file is compressed to estimate its size, and how much is added to the estimate of larger files
+_SAMPLE_SIZE: int = 1024 * 1024
+_ESTIMATE_MARGIN: float = 1.1
+
+
+def _entry_overhead(name: str) -> int:
+    # Local file header, central directory entry, data descriptor and zip64 extras, with some headroom
+    return 160 + 2 * len(name.encode("utf-8"))
+
+
+def _arcname(path: str, out_dir: str) -> str:
+    relative = os.path.relpath(path, out_dir)
+    return os.path.basename(path) if relative.startswith(os.pardir) else relative
+
+
+def _estimated_size(path: str, level: int) -> int:
+    # zipfile compresses using the same raw deflate stream, so files no larger than the sample are estimated exactly
+    size = os.path.getsize(path)
+    with open(path, "rb") as file:
+        sample = file.read(_SAMPLE_SIZE)
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    compressed = len(compressor.compress(sample)) + len(compressor.flush())
+    if len(sample) >= size:
+        return compressed
+    return math.ceil(compressed * size / len(sample) * _ESTIMATE_MARGIN)
+
+
+def _split(path: str, limit: int) -> List[str]:
+    parts: List[str] = []
+    with open(path, "rb") as file:
+        while True:
+            part_path = f"{path}.{len(parts) + 1:03}"
+            with open(part_path, "wb") as part:
+                remaining = limit
+                while remaining > 0 and (chunk := file.read(min(_CHUNK_SIZE, remaining))):
+                    part.write(chunk)
+                    remaining -= len(chunk)
+            if os.path.getsize(part_path) == 0:
+                os.remove(part_path)
+                break
+            parts.append(part_path)
+    os.remove(path)
+    return parts
+
+
+def bundle_transcripts(
+    paths: List[str],
+    out_dir: str,
+    name: str,
+    limit: int = TRANSCRIPT_UPLOAD_LIMIT,
+    level: int = TRANSCRIPT_COMPRESSION_LEVEL,
+) -> List[str]:
+    """Packs transcripts into zip volumes which fit under the upload limit. Blocks while compressing.
+
+    Args:
+        paths (List[str]): The transcripts to pack
+        out_dir (str): The directory to write the volumes to
+        name (str): The base name of the volumes
+        limit (int): The upload limit in bytes
+        level (int): The deflate compression level
+
+    Returns:
+        List[str]: The paths of the volumes, every one of which is at most `limit` bytes
+    """
+    # End of central directory record, with zip64 records
+    usable = limit - 128
+    estimates: Dict[str, int] = {path: _estimated_size(path, level) for path in paths}
+    archives: List[zipfile.ZipFile] = []
+    free: List[int] = []
+    try:
+        # First fit decreasing, which keeps the number of volumes close to optimal
+        for path in sorted(paths, key=estimates.get, reverse=True):  # type: ignore
+            arcname = _arcname(path, out_dir)
+            overhead = _entry_overhead(arcname)
+            i = next((i for i, space in enumerate(free) if estimates[path] + overhead <= space), len(archives))
+            if i == len(archives):
+                volume_path = os.path.join(out_dir, f"{name}.zip" if i == 0 else f"{name}-{i + 1}.zip")
+                archives.append(
+                    zipfile.ZipFile(volume_path, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=level)
+                )
+                free.append(usable)
+            # Files in subdirectories of out_dir, e.g. mirrored assets, keep their relative path
+            archives[i].write(path, arcname=arcname)
+            free[i] -= archives[i].getinfo(arcname).compress_size + overhead
+    finally:
+        for archive in archives:
+            archive.close()
+    volumes: List[str] = []
+    for archive in archives:
+        volume_path = archive.filename  # type: ignore
+        if os.path.getsize(volume_path) > limit:
+            volumes.extend(_split(volume_path, limit))
+        else:
+            volumes.append(volume_path)
+    return volumes
@@ -0,0 +1,260 @@
+import asyncio
+from typing import List
+import discord
+from discord.ext import commands
+import os
+from ...config.transcript_config import TRANSCRIPT_FORMATS, TRANSCRIPT_SEARCH_PAGE_SIZE
+from .bundle import bundle_transcripts
+from . import export
+from .export import export_transcript, safe_file_name
+from .jobs import JobState, ThreadTranscriptionRunner, TranscriptJob, TranscriptJobQueue
+from .render import FORMATS, STYLESHEET_NAME, parse_formats
+from .search import SearchResult, search_transcripts
+
+
+class SearchResultsView(discord.ui.View):
+    """Pages through /transcriptsearch results using Previous/Next buttons"""
+    member: discord.Member
+    guild_id: int
+    query: str
+    page: int
+    results: List[SearchResult]
+
+    def __init__(self, member: discord.Member, query: str):
+        super().__init__(timeout=180)
+        self.member = member
+        self.guild_id = member.guild.id
+        self.query = query
+        self.page = 0
+        self.results = []
+
+    async def load(self) -> str:
+        """Fetches the current page and returns the message describing it"""
+        # Fetch one extra result to find out whether there is a next page
+        results = await search_transcripts(
+            self.member,
+            self.query,
+            offset=self.page * TRANSCRIPT_SEARCH_PAGE_SIZE,
+            limit=TRANSCRIPT_SEARCH_PAGE_SIZE + 1,
+        )
+        self.results = results[:TRANSCRIPT_SEARCH_PAGE_SIZE]
+        self.previous.disabled = self.page == 0
+        self.next.disabled = len(results) <= TRANSCRIPT_SEARCH_PAGE_SIZE
+        if not self.results:
+            return f"No transcripts mention `{discord.utils.escape_markdown(self.query)}`."
+        lines = [
+            f"[#{result.channel}](https://discord.com/channels/{self.guild_id}/{result.channel_id}/{result.message_id}) "
+            + f"<t:{result.timestamp}:d> **{discord.utils.escape_markdown(result.author)}**: "
+            + discord.utils.escape_mentions(result.snippet)
+            for result in self.results
+        ]
+        return f"Results for `{discord.utils.escape_markdown(self.query)}` (page {self.page + 1}):\n" + "\n".join(lines)
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return interaction.user.id == self.member.id
+
+    @discord.ui.button(label="Previous", style=discord.ButtonStyle.secondary)
+    async def previous(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page = max(self.page - 1, 0)
+        await interaction.response.edit_message(content=await self.load(), view=self)
+
+    @discord.ui.button(label="Next", style=discord.ButtonStyle.secondary)
+    async def next(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page += 1
+        await interaction.response.edit_message(content=await self.load(), view=self)
+
+
+def describe_job(job: TranscriptJob) -> str:
+    if job.state == JobState.QUEUED:
+        return f"queued <t:{round(job.created.timestamp())}:R>"
+    if job.state == JobState.RUNNING:
+        return f"running since <t:{round(job.started.timestamp())}:R>" # type: ignore
+    if job.state == JobState.DONE:
+        return f"done <t:{round(job.finished.timestamp())}:R>" # type: ignore
+    return f"failed <t:{round(job.finished.timestamp())}:R>: {job.error}" # type: ignore
+
+
+class Transcripts(commands.Cog):
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.out_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'out')
+        # Every command runs as a job with its own directory inside out_dir
+        self.jobs = TranscriptJobQueue(self.out_dir)
+
+    async def cog_unload(self) -> None:
+        await self.jobs.close()
+        if export.asset_mirror is not None:
+            await export.asset_mirror.close()
+
+    async def send_transcripts(self, user: discord.abc.User, name: str, directory: str):
+        # Get a list of transcripts in the job's directory
+        transcripts = [file for file in os.listdir(directory) if file.rsplit('.', 1)[-1] in FORMATS]
+
+        # Check if there are transcripts in the job's directory
+        if not transcripts:
+            raise commands.CommandError("No transcripts were written.")
+
+        # HTML transcripts link the stylesheet, which is bundled along with them
+        if os.path.exists(os.path.join(directory, STYLESHEET_NAME)):
+            transcripts.append(STYLESHEET_NAME)
+
+        # So are the mirrored assets which the transcripts reference by relative paths
+        if export.asset_mirror is not None and export.asset_mirror.relative:
+            asset_dir = os.path.join(directory, export.asset_mirror.base_url)
+            if os.path.isdir(asset_dir):
+                transcripts.extend(
+                    os.path.relpath(os.path.join(asset_dir, file), directory) for file in os.listdir(asset_dir)
+                )
+
+        # Compress the transcripts into as few archives as the upload limit allows
+        volumes = await asyncio.to_thread(
+            bundle_transcripts,
+            [os.path.join(directory, transcript) for transcript in transcripts],
+            directory,
+            safe_file_name(name),
+        )
+
+        try:
+            # Send each archive
+            for volume in volumes:
+                await user.send(file=discord.File(volume))
+
+            print(f"Transcripts sent to {user.name}")
+        except discord.errors.Forbidden:
+            print("Error: Unable to send files to the specified user. Make sure the user allows direct messages.")
+        # The job's directory is deleted once it finishes
+
+
+    @commands.hybrid_command(
+        name="transcriptchannel", 
+        usage="/transcriptchannel <channel name> [incremental] [formats]", 
+        description="creates transcript for a channel",
+    )
+    async def transcriptchannel(
+        self,
+        ctx: commands.Context,
+        channel: discord.TextChannel,
+        incremental: bool = False,
+        formats: str = TRANSCRIPT_FORMATS,
+    ):
+        format_names = parse_formats(formats)
+
+        async def work(job: TranscriptJob):
+            await export_transcript(
+                channel, job.directory, channel.name, format_names, incremental=incremental # type: ignore
+            )
+            await self.send_transcripts(job.user, channel.name, job.directory) # type: ignore
+
+        try:
+            job = self.jobs.submit(f"Transcript of {channel.mention}", ctx.author, work)
+        except commands.CommandError as e:
+            await ctx.send(str(e))
+            return
+        await ctx.send(f"Queued transcript job #{job.id}, the transcript will be sent to your DMs.")
+    
+    
+    @commands.hybrid_command(
+        name="transcriptthread", 
+        usage="/transcriptthread <channel name> [incremental] [formats]", 
+        description="creates transcript for a channel",
+    ) 
+    async def transcriptthread(
+        self,
+        ctx: commands.Context,
+        thread: discord.Thread,
+        incremental: bool = False,
+        formats: str = TRANSCRIPT_FORMATS,
+    ):
+        format_names = parse_formats(formats)
+
+        async def work(job: TranscriptJob):
+            await export_transcript(
+                thread, job.directory, thread.name, format_names, incremental=incremental # type: ignore
+            )
+            await self.send_transcripts(job.user, thread.name, job.directory) # type: ignore
+
+        try:
+            job = self.jobs.submit(f"Transcript of {thread.mention}", ctx.author, work)
+        except commands.CommandError as e:
+            await ctx.send(str(e))
+            return
+        await ctx.send(f"Queued transcript job #{job.id}, the transcript will be sent to your DMs.")
+        
+        
+    @commands.hybrid_command(
+        name="transcriptthreads", 
+        usage="/transcriptthreads <channel name> [incremental] [formats]", 
+        description="creates transcripts for all threads in a channel",
+    )
+    async def transcriptthreads(
+        self,
+        ctx: commands.Context,
+        channel: discord.TextChannel,
+        incremental: bool = False,
+        formats: str = TRANSCRIPT_FORMATS,
+    ):
+        """
+        Creates transcripts for a given channel.
+
+        Args:
+            ctx (commands.Context): The context of the command.
+            channel (discord.TextChannel): The channel for which to create transcripts.
+            incremental (bool): Only fetch messages posted since the last export of each thread.
+            formats (str): The output formats to send, comma separated: html, jsonl, md.
+
+        Returns:
+            None
+
+        Examples:
+            # Create transcripts for a channel
+            /transcriptChannel #general
+        """
+        format_names = parse_formats(formats)
+        status = await ctx.send(f"Queued transcripts of the threads in {channel.mention}...")
+
+        async def work(job: TranscriptJob):
+            runner = ThreadTranscriptionRunner(
+                job.directory, format_names, status=status, incremental=incremental # type: ignore
+            )
+            result = await runner.run(channel.archived_threads())
+            if not result.paths:
+                return
+            await self.send_transcripts(job.user, f"{channel.name}-threads", job.directory) # type: ignore
+
+        try:
+            self.jobs.submit(f"Transcripts of the threads in {channel.mention}", ctx.author, work)
+        except commands.CommandError as e:
+            await status.edit(content=str(e))
+
+
+    @commands.hybrid_command(
+        name="transcriptjobs",
+        usage="/transcriptjobs",
+        description="shows the transcript jobs which are queued, running or recently finished",
+    )
+    async def transcriptjobs(self, ctx: commands.Context):
+        jobs = self.jobs.active() + self.jobs.finished()
+        if not jobs:
+            await ctx.send("No transcript jobs have been queued yet.", ephemeral=True)
+            return
+        lines = [f"#{job.id} {job.description} for {job.user.mention}: {describe_job(job)}" for job in jobs]
+        # Stay under Discord's message length limit, the oldest finished jobs are listed last
+        while len(lines) > 1 and len("\n".join(lines)) > 2000:
+            lines.pop()
+        await ctx.send("\n".join(lines)[:2000], ephemeral=True)
+
+
+    @commands.hybrid_command(
+        name="transcriptsearch",
+        usage="/transcriptsearch <query>",
+        description="searches the messages of exported transcripts",
+    )
+    @commands.guild_only()
+    async def transcriptsearch(self, ctx: commands.Context, *, query: str):
+        # Results are limited to the channels the author can read
+        view = SearchResultsView(ctx.author, query) # type: ignore
+        content = await view.load()
+        await ctx.send(content, view=view, ephemeral=True)
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(Transcripts(bot))
\ No newline at end of file
@@ -0,0 +1,170 @@
+"""Transcript exports with per-channel checkpoints
+
+Every export is rendered into the archive directory, and the ID of the last exported message is stored as a
+checkpoint. Incremental exports then only fetch the messages posted after the checkpoint, and append them to the
+archived transcript instead of fetching the whole history again.
+
+A full export is rendered into temporary files, which replace the archived transcript once it succeeded. The checkpoint
+is removed while an export is writing and saved once it has finished, so an export which fails or is interrupted is
+followed by a full export instead of appending to a transcript which doesn't match its checkpoint.
+
+A full export only renders the formats it was asked for, and removes the other formats from the archive. Incremental
+exports append to every archived format in the same pass, as they all share the checkpoint, and fall back to a full
+export if a requested format isn't archived. Exports copy the formats they were asked for out of the archive, along
+with the stylesheet of HTML transcripts and the mirrored assets they reference.
+
+Functions:
+    safe_file_name: Turns a channel or thread name into a file name.
+    get_checkpoint: Returns the last exported message ID of a channel or thread.
+    export_transcript: Exports a channel or thread, optionally continuing from its checkpoint.
+"""
+import asyncio
+import logging
+import os
+import shutil
+from typing import Dict, Iterable, List, Tuple
+
+import discord
+
+from ...config.transcript_config import (
+    TRANSCRIPT_ARCHIVE_DIR,
+    TRANSCRIPT_MIRROR_ASSETS,
+    TRANSCRIPT_SEARCH_INDEX,
+)
+from ...database import run_in_session
+from ...database.models.transcript_checkpoint import TranscriptCheckpointModel
+from .assets import AssetMirror
+from .render import FORMATS, STYLESHEET_NAME, STYLESHEET_PATH, TranscriptStats, render_transcript
+from .search import SearchIndexer
+
+logger: logging.Logger = logging.getLogger("Eternal.Main")
+
+# Two exports of the same channel must not write to its archived transcript at the same time
+_locks: Dict[int, asyncio.Lock] = dict()
+
+# Shared by every export, so assets are deduplicated across transcripts
+asset_mirror: AssetMirror | None = AssetMirror() if TRANSCRIPT_MIRROR_ASSETS else None
+
+
+def safe_file_name(name: str) -> str:
+    """Replaces the characters of a channel or thread name which can't appear in a file name, e.g. Q/A becomes Q_A"""
+    for separator in (os.sep, os.altsep, "\0"):
+        if separator:
+            name = name.replace(separator, "_")
+    return name
+
+
+async def get_checkpoint(channel_id: int) -> int | None:
+    """Returns the ID of the last exported message of a channel or thread, or None if it was never exported"""
+    checkpoint: TranscriptCheckpointModel | None = await run_in_session(
+        lambda session: session.get(TranscriptCheckpointModel, channel_id)
+    )
+    return None if checkpoint is None else checkpoint.lastMessageId
+
+
+async def _save_checkpoint(channel_id: int, last_message_id: int) -> None:
+    await run_in_session(
+        lambda session: session.merge(TranscriptCheckpointModel(channel_id, last_message_id))
+    )
+
+
+async def _delete_checkpoint(channel_id: int) -> None:
+    await run_in_session(
+        lambda session: session.query(TranscriptCheckpointModel).filter_by(channelId=channel_id).delete()
+    )
+
+
+def _copy_files(files: List[Tuple[str, str]]) -> None:
+    for source, destination in files:
+        shutil.copyfile(source, destination)
+
+
+def _replace_files(files: List[Tuple[str, str]]) -> None:
+    for source, destination in files:
+        os.replace(source, destination)
+
+
+def _remove_files(paths: Iterable[str]) -> None:
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+async def export_transcript(
+    messageable: discord.TextChannel | discord.Thread,
+    directory: str,
+    name: str,
+    formats: List[str],
+    incremental: bool = False,
+) -> TranscriptStats:
+    """Exports the transcript of a channel or thread.
+
+    Args:
+        messageable (discord.TextChannel | discord.Thread): The channel or thread to export
+        directory (str): Where to write a copy of the full transcript in each requested format
+        name (str): The file name of the copies, without extension, see safe_file_name
+        formats (List[str]): The output formats to copy, see render.FORMATS
+        incremental (bool): Only fetch messages after the last export, if there is one
+
+    Returns:
+        TranscriptStats: The number of messages fetched by this export, the ID of the last one and the paths of the
+            copies, not including the stylesheet
+    """
+    all_paths = {
+        format: os.path.join(TRANSCRIPT_ARCHIVE_DIR, f"{messageable.id}.{format}") for format in FORMATS
+    }
+    lock = _locks.setdefault(messageable.id, asyncio.Lock())
+    async with lock:
+        archived = [format for format, path in all_paths.items() if os.path.exists(path)]
+        after: int | None = None
+        # The requested formats have to be archived to continue from the checkpoint
+        if incremental and all(format in archived for format in formats):
+            after = await get_checkpoint(messageable.id)
+        if after is None:
+            os.makedirs(TRANSCRIPT_ARCHIVE_DIR, exist_ok=True)
+            # A full export only renders the requested formats
+            archive_paths = {format: all_paths[format] for format in formats}
+        else:
+            logger.info("Exporting %s incrementally after message %d", messageable.name, after)
+            # Every archived format is kept up to date, appending new messages is cheap
+            archive_paths = {format: all_paths[format] for format in archived}
+        # Until this export has finished, the archive and search index may hold messages past the checkpoint.
+        # Without a checkpoint, an export which fails or is interrupted is followed by a full export.
+        await _delete_checkpoint(messageable.id)
+        # A full export is written next to the archive, which is only replaced once the export succeeded
+        write_paths = archive_paths if after is not None else {
+            format: f"{path}.tmp" for format, path in archive_paths.items()
+        }
+        indexer = SearchIndexer(messageable, replace=after is None) if TRANSCRIPT_SEARCH_INDEX else None
+        try:
+            stats = await render_transcript(
+                messageable,
+                write_paths,
+                after=after,
+                mirror=asset_mirror,
+                indexer=indexer,
+            )
+        except BaseException:
+            if after is None:
+                await asyncio.to_thread(_remove_files, write_paths.values())
+            raise
+        if after is None:
+            await asyncio.to_thread(_replace_files, list(zip(write_paths.values(), archive_paths.values())))
+            # Archived formats which weren't rendered end before the new checkpoint
+            stale = [path for format, path in all_paths.items() if format not in archive_paths]
+            await asyncio.to_thread(_remove_files, stale)
+        last_message_id = stats.last_message_id if stats.last_message_id is not None else after
+        if last_message_id is not None:
+            await _save_checkpoint(messageable.id, last_message_id)
+        name = safe_file_name(name)
+        stats.paths = paths = [os.path.join(directory, f"{name}.{format}") for format in formats]
+        # The archived HTML transcripts link the stylesheet as well
+        copies = [(STYLESHEET_PATH, os.path.join(TRANSCRIPT_ARCHIVE_DIR, STYLESHEET_NAME))]
+        copies.extend((archive_paths[format], path) for format, path in zip(formats, paths))
+        if "html" in formats:
+            copies.append((STYLESHEET_PATH, os.path.join(directory, STYLESHEET_NAME)))
+        await asyncio.to_thread(_copy_files, copies)
+        if asset_mirror is not None:
+            # Relative references to mirrored assets only resolve next to a copy of the assets
+            await asyncio.to_thread(asset_mirror.copy_referenced, paths, directory)
+    return stats
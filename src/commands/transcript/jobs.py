@@ -0,0 +1,302 @@
+"""Transcript jobs
+
+Every transcript command runs as a job. Jobs go through a bounded queue, at most a configurable number run at the
+same time, and each one writes into its own scratch directory, which is deleted once the job finishes.
+
+Classes:
+    TranscriptJob: A queued or running transcript export.
+    TranscriptJobQueue: Runs transcript jobs with bounded concurrency.
+    ThreadTranscriptionResult: The outcome of transcribing a batch of threads.
+    ThreadTranscriptionRunner: Transcribes many threads concurrently, with bounded parallelism.
+"""
+import asyncio
+import logging
+import os
+import shutil
+import tempfile
+import time
+from collections import deque
+from datetime import datetime
+from enum import Enum
+from typing import AsyncIterator, Awaitable, Callable, Deque, List
+
+import discord
+from discord.ext import commands
+
+from ...config.transcript_config import (
+    TRANSCRIPT_JOB_CONCURRENCY,
+    TRANSCRIPT_JOB_HISTORY,
+    TRANSCRIPT_JOB_QUEUE_SIZE,
+    TRANSCRIPT_PROGRESS_INTERVAL,
+    TRANSCRIPT_THREAD_CONCURRENCY,
+)
+from .export import export_transcript
+
+logger: logging.Logger = logging.getLogger("Eternal.Main")
+
+
+class JobState(Enum):
+    QUEUED = 0
+    RUNNING = 1
+    DONE = 2
+    FAILED = 3
+
+
+class TranscriptJob:
+    id: int
+    description: str
+    user: discord.abc.User
+    state: JobState
+    directory: str | None
+    created: datetime
+    started: datetime | None
+    finished: datetime | None
+    error: str | None
+    _work: Callable[["TranscriptJob"], Awaitable[None]]
+
+    def __init__(
+        self,
+        id: int,
+        description: str,
+        user: discord.abc.User,
+        work: Callable[["TranscriptJob"], Awaitable[None]],
+    ) -> None:
+        self.id = id
+        self.description = description
+        self.user = user
+        self.state = JobState.QUEUED
+        self.directory = None
+        self.created = datetime.now()
+        self.started = None
+        self.finished = None
+        self.error = None
+        self._work = work
+
+
+class TranscriptJobQueue:
+    """Runs transcript jobs, at most `concurrency` at a time, with at most `queue_size` jobs waiting.
+
+    Each job receives its own scratch directory inside `root` (`job.directory`), so concurrent jobs never see each
+    other's files. The directory is deleted once the job finishes, whether it succeeded or not.
+    The user who requested a job is sent a direct message if it fails.
+    """
+    root: str
+    concurrency: int
+    queue_size: int
+    jobs: Deque[TranscriptJob]
+    _queue: asyncio.Queue | None
+    _workers: List[asyncio.Task]
+    _next_id: int
+
+    def __init__(
+        self,
+        root: str,
+        concurrency: int = TRANSCRIPT_JOB_CONCURRENCY,
+        queue_size: int = TRANSCRIPT_JOB_QUEUE_SIZE,
+    ) -> None:
+        self.root = root
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        # Finished jobs are only kept around for the status command, the oldest ones are dropped
+        self.jobs = deque(maxlen=TRANSCRIPT_JOB_HISTORY)
+        self._queue = None
+        self._workers = []
+        self._next_id = 1
+
+    def submit(
+        self,
+        description: str,
+        user: discord.abc.User,
+        work: Callable[[TranscriptJob], Awaitable[None]],
+    ) -> TranscriptJob:
+        """Queues a job.
+
+        Args:
+            description (str): Describes the job in its status
+            user (discord.abc.User): The user who requested the job
+            work (Callable[[TranscriptJob], Awaitable[None]]): Runs the job, writing its files into `job.directory`
+
+        Raises:
+            commands.CommandError: The queue is full
+
+        Returns:
+            TranscriptJob: The queued job
+        """
+        self._start()
+        job = TranscriptJob(self._next_id, description, user, work)
+        try:
+            self._queue.put_nowait(job)  # type: ignore
+        except asyncio.QueueFull:
+            raise commands.CommandError(
+                "Too many transcripts are being exported right now, please try again later."
+            )
+        self._next_id += 1
+        self.jobs.append(job)
+        return job
+
+    def active(self) -> List[TranscriptJob]:
+        """Returns the queued and running jobs"""
+        return [job for job in self.jobs if job.state in (JobState.QUEUED, JobState.RUNNING)]
+
+    def finished(self) -> List[TranscriptJob]:
+        """Returns the remembered jobs which are done or failed, the most recent first"""
+        return sorted(
+            (job for job in self.jobs if job.state in (JobState.DONE, JobState.FAILED)),
+            key=lambda job: job.finished,  # type: ignore
+            reverse=True,
+        )
+
+    async def close(self) -> None:
+        """Cancels the workers. Jobs which are still queued won't run."""
+        for worker in self._workers:
+            worker.cancel()
+        self._workers = []
+        self._queue = None
+
+    def _start(self) -> None:
+        # Started lazily, extensions are loaded before the bot's event loop is running
+        if self._workers:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._workers = [
+            asyncio.create_task(self._worker()) for _ in range(self.concurrency)
+        ]
+
+    async def _worker(self) -> None:
+        while True:
+            job: TranscriptJob = await self._queue.get()  # type: ignore
+            await self._run(job)
+
+    async def _run(self, job: TranscriptJob) -> None:
+        job.state = JobState.RUNNING
+        job.started = datetime.now()
+        os.makedirs(self.root, exist_ok=True)
+        job.directory = tempfile.mkdtemp(prefix=f"job-{job.id}-", dir=self.root)
+        try:
+            await job._work(job)
+            job.state = JobState.DONE
+        except Exception as e:
+            logger.error("Transcript job %d (%s) failed", job.id, job.description, exc_info=e)
+            job.state = JobState.FAILED
+            # Command errors are meant to be shown, anything else only ends up in the log
+            job.error = str(e) if isinstance(e, commands.CommandError) else "Something went wrong, see the bot's log."
+            await self._notify_failure(job)
+        finally:
+            job.finished = datetime.now()
+            await asyncio.to_thread(shutil.rmtree, job.directory, True)
+
+    async def _notify_failure(self, job: TranscriptJob) -> None:
+        try:
+            await job.user.send(f"Transcript job #{job.id} ({job.description}) failed: {job.error}")
+        except discord.HTTPException as e:
+            logger.warning("Failed to tell %s that transcript job %d failed", job.user.name, job.id, exc_info=e)
+
+
+class ThreadTranscriptionResult:
+    paths: List[str]
+    failed: List[discord.Thread]
+    message_count: int
+
+    def __init__(self) -> None:
+        self.paths = []
+        self.failed = []
+        self.message_count = 0
+
+
+class ThreadTranscriptionRunner:
+    """Transcribes threads concurrently, at most `concurrency` at a time.
+
+    Keeping the number of concurrent history fetches bounded keeps us well within the rate limits,
+    which discord.py's HTTP client handles for requests that do hit them.
+    Progress is reported by editing a single status message, at most once every `progress_interval` seconds.
+    """
+    out_dir: str
+    formats: List[str]
+    status: discord.Message | None
+    incremental: bool
+    progress_interval: float
+    _semaphore: asyncio.Semaphore
+    _total: int
+    _done: int
+    _last_progress: float
+
+    def __init__(
+        self,
+        out_dir: str,
+        formats: List[str],
+        status: discord.Message | None = None,
+        incremental: bool = False,
+        concurrency: int = TRANSCRIPT_THREAD_CONCURRENCY,
+        progress_interval: float = TRANSCRIPT_PROGRESS_INTERVAL,
+    ) -> None:
+        self.out_dir = out_dir
+        self.formats = formats
+        self.status = status
+        self.incremental = incremental
+        self.progress_interval = progress_interval
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._total = 0
+        self._done = 0
+        self._last_progress = 0.0
+
+    async def run(self, threads: AsyncIterator[discord.Thread]) -> ThreadTranscriptionResult:
+        """Transcribes every thread and waits until all of them are written.
+
+        Args:
+            threads (AsyncIterator[discord.Thread]): The threads to transcribe, e.g. `channel.archived_threads()`
+
+        Returns:
+            ThreadTranscriptionResult: The written transcripts and the threads which failed
+        """
+        result = ThreadTranscriptionResult()
+        tasks: List[asyncio.Task] = []
+        try:
+            async for thread in threads:
+                self._total += 1
+                tasks.append(asyncio.create_task(self._transcribe(thread, result)))
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # Listing the threads failed or the job was cancelled, don't leave transcriptions writing into a
+            # job directory which is about to be deleted
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        await self._report(
+            f"Transcribed {len(result.paths)}/{self._total} threads ({result.message_count} messages)"
+            + (f", {len(result.failed)} failed" if result.failed else ""),
+            force=True,
+        )
+        return result
+
+    async def _transcribe(self, thread: discord.Thread, result: ThreadTranscriptionResult) -> None:
+        async with self._semaphore:
+            try:
+                stats = await export_transcript(
+                    thread,
+                    self.out_dir,
+                    # The thread ID keeps threads with the same name from writing to the same file
+                    f"{thread.name}-{thread.id}",
+                    self.formats,
+                    incremental=self.incremental,
+                )
+                result.message_count += stats.count
+                result.paths.extend(stats.paths)
+            except Exception as e:
+                # Reported in the summary, the other threads are still transcribed
+                logger.error("Failed to transcribe thread %s (%d)", thread.name, thread.id, exc_info=e)
+                result.failed.append(thread)
+            self._done += 1
+        await self._report(f"Transcribing threads... {self._done}/{self._total}")
+
+    async def _report(self, text: str, force: bool = False) -> None:
+        if self.status is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_progress < self.progress_interval:
+            return
+        self._last_progress = now
+        try:
+            await self.status.edit(content=text)
+        except discord.HTTPException as e:
+            logger.warning("Failed to update transcript progress", exc_info=e)
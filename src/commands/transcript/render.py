@@ -0,0 +1,315 @@
+"""Streaming transcript rendering
+
+Messages are written to the transcript as they are fetched, oldest first, so memory use stays flat no matter how long
+the channel's history is. A single pass over the history can feed several writers, one per output format:
+
+    html: The transcript as a web page, styled by the shared `transcript.css` stylesheet
+    jsonl: One JSON object per message, for further processing
+    md: The transcript as Markdown
+
+Markup is built from templates which are compiled once, when the module is imported. Everything inserted into HTML
+transcripts is HTML-escaped, so message content can't add markup or scripts to the page.
+
+Functions:
+    escape_html: Escapes markdown and mentions in message content.
+    escape_attachments: Renders a message's attachments as img tags.
+    parse_formats: Parses a list of output formats.
+    render_transcript: Writes the history of a channel or thread into one file per output format.
+
+Classes:
+    TranscriptWriter: Writes a transcript in one output format.
+    HtmlWriter, JsonlWriter, MarkdownWriter: The output formats.
+    TranscriptStats: What a render wrote.
+"""
+import asyncio
+import html
+import json
+import os
+from abc import ABC, abstractmethod
+from collections import deque
+from contextlib import ExitStack, aclosing
+from string import Template
+from typing import AsyncIterator, Deque, Dict, List, TextIO, Tuple, Type
+
+import discord
+from discord.ext import commands
+
+from ...config.transcript_config import TRANSCRIPT_ASSET_WINDOW, TRANSCRIPT_WRITE_BUFFER
+from .assets import AssetMirror
+from .search import SearchIndexer
+
+# Linked by every HTML transcript, and copied next to them
+STYLESHEET_NAME: str = "transcript.css"
+STYLESHEET_PATH: str = os.path.join(os.path.dirname(__file__), "static", STYLESHEET_NAME)
+
+_HTML_HEADER = Template(
+    '<!DOCTYPE html>\n<html>\n<head>\n<meta charset="UTF-8">\n'
+    '<meta name="viewport" content="width=device-width, initial-scale=1.0">\n'
+    '<title>Transcript of $name</title>\n<link rel="stylesheet" href="$stylesheet">\n</head>\n<body>\n$preamble'
+)
+_HTML_MESSAGE = Template(
+    '<div><img class="avatar" src="$avatar"> <strong><a style="color: $color">$author</a>:</strong> $content</div>'
+    '<div>$attachments</div>\n'
+)
+_HTML_ATTACHMENT = Template('<img class="attachment" src="$url" alt="Attachment">')
+_MARKDOWN_HEADER = Template("# Transcript of $name\n\n$preamble")
+_MARKDOWN_MESSAGE = Template("**$author** ($timestamp): $content\n$attachments\n")
+_MARKDOWN_ATTACHMENT = Template("![Attachment]($url)\n")
+
+
+def escape_html(text: str) -> str:
+    """
+    Escapes special characters in the given text to prevent Markdown and mentions from being interpreted in Discord.
+
+    Parameters:
+        - text (str): The text to be escaped.
+
+    Returns:
+        str: The escaped text.
+    """
+    return discord.utils.escape_markdown(discord.utils.escape_mentions(text))
+
+
+def escape_attachments(attachments: List[discord.Attachment], assets: Dict[str, str] | None = None) -> str:
+    """
+    Escapes the URLs of attachments for embedding in Discord messages.
+
+    Parameters:
+        - attachments (list): A list of attachments, where each attachment is an object with a 'url' attribute.
+        - assets (dict): Maps URLs to their mirrored copies, URLs which aren't in it are used as is.
+
+    Returns:
+        str: A string containing HTML img tags for each attachment, with escaped URLs and styling.
+            If no attachments are provided, an empty string is returned.
+    """
+    if not attachments:
+        return ""
+    if assets is None:
+        assets = dict()
+
+    attachment_list = [
+        _HTML_ATTACHMENT.substitute(
+            url=html.escape(discord.utils.escape_markdown(assets.get(attachment.url, attachment.url)))
+        )
+        for attachment in attachments
+    ]
+    return " ".join(attachment_list)
+
+
+def asset_urls(message: discord.Message) -> List[str]:
+    """Returns the URLs of the avatar and attachments shown for a message"""
+    return [str(message.author.display_avatar)] + [
+        attachment.url for attachment in message.attachments
+    ]
+
+
+def _preamble(messageable: discord.TextChannel | discord.Thread) -> str:
+    if isinstance(messageable, discord.Thread):
+        # Thread ID and Name
+        return f"Thread ID: {messageable.id}, Name: {messageable.name}"
+    return ""
+
+
+class TranscriptWriter(ABC):
+    """Writes a transcript in one output format, one message at a time.
+
+    Subclasses set `extension`, implement `write_message` and may override `write_header`.
+    """
+    extension: str = ""
+    file: TextIO
+
+    def __init__(self, path: str, append: bool = False) -> None:
+        self.file = open(path, "a" if append else "w", encoding="utf-8", buffering=TRANSCRIPT_WRITE_BUFFER)
+
+    def write_header(self, messageable: discord.TextChannel | discord.Thread) -> None:
+        """Written once, before the first message of a full export"""
+
+    @abstractmethod
+    def write_message(self, message: discord.Message, assets: Dict[str, str] | None = None) -> None:
+        """Written for every message, oldest first"""
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class HtmlWriter(TranscriptWriter):
+    extension = "html"
+
+    def write_header(self, messageable: discord.TextChannel | discord.Thread) -> None:
+        self.file.write(
+            _HTML_HEADER.substitute(
+                name=html.escape(messageable.name),
+                stylesheet=STYLESHEET_NAME,
+                preamble=html.escape(_preamble(messageable)),
+            )
+        )
+
+    def write_message(self, message: discord.Message, assets: Dict[str, str] | None = None) -> None:
+        avatar = str(message.author.display_avatar)
+        if assets is not None:
+            avatar = assets.get(avatar, avatar)
+        self.file.write(
+            _HTML_MESSAGE.substitute(
+                avatar=html.escape(avatar),
+                color=message.author.color,
+                author=html.escape(message.author.name),
+                content=html.escape(escape_html(message.content)),
+                attachments=escape_attachments(message.attachments, assets),
+            )
+        )
+
+
+class JsonlWriter(TranscriptWriter):
+    extension = "jsonl"
+
+    def write_message(self, message: discord.Message, assets: Dict[str, str] | None = None) -> None:
+        if assets is None:
+            assets = dict()
+        avatar = str(message.author.display_avatar)
+        record = {
+            "id": message.id,
+            "channel_id": message.channel.id,
+            "author_id": message.author.id,
+            "author": message.author.name,
+            "avatar": assets.get(avatar, avatar),
+            "timestamp": message.created_at.isoformat(),
+            "content": message.content,
+            "attachments": [assets.get(attachment.url, attachment.url) for attachment in message.attachments],
+        }
+        self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+class MarkdownWriter(TranscriptWriter):
+    extension = "md"
+
+    def write_header(self, messageable: discord.TextChannel | discord.Thread) -> None:
+        preamble = _preamble(messageable)
+        self.file.write(
+            _MARKDOWN_HEADER.substitute(name=messageable.name, preamble=f"{preamble}\n\n" if preamble else "")
+        )
+
+    def write_message(self, message: discord.Message, assets: Dict[str, str] | None = None) -> None:
+        if assets is None:
+            assets = dict()
+        self.file.write(
+            _MARKDOWN_MESSAGE.substitute(
+                author=discord.utils.escape_markdown(message.author.name),
+                timestamp=message.created_at.strftime("%Y-%m-%d %H:%M"),
+                content=message.content,
+                attachments="".join(
+                    _MARKDOWN_ATTACHMENT.substitute(url=assets.get(attachment.url, attachment.url))
+                    for attachment in message.attachments
+                ),
+            )
+        )
+
+
+# Output formats by name, which is also the extension of their files
+FORMATS: Dict[str, Type[TranscriptWriter]] = {
+    writer.extension: writer for writer in (HtmlWriter, JsonlWriter, MarkdownWriter)
+}
+
+
+def parse_formats(formats: str) -> List[str]:
+    """Parses a comma or space separated list of output formats, e.g. "html, jsonl".
+
+    Raises:
+        commands.BadArgument: If a format is unknown or none is given
+    """
+    names = list(dict.fromkeys(name.lower() for name in formats.replace(",", " ").split()))
+    unknown = [name for name in names if name not in FORMATS]
+    if unknown:
+        raise commands.BadArgument(
+            f"Unknown transcript format {', '.join(unknown)}, choose from {', '.join(FORMATS)}."
+        )
+    if not names:
+        raise commands.BadArgument(f"Choose at least one transcript format from {', '.join(FORMATS)}.")
+    return names
+
+
+async def _with_assets(
+    messages: AsyncIterator[discord.Message], mirror: AssetMirror | None
+) -> AsyncIterator[Tuple[discord.Message, Dict[str, str] | None]]:
+    if mirror is None:
+        async for message in messages:
+            yield message, None
+        return
+    # Assets are downloaded up to TRANSCRIPT_ASSET_WINDOW messages ahead, so downloads overlap
+    # while messages still come out in order and memory stays bounded
+    pending: Deque[Tuple[discord.Message, asyncio.Task]] = deque()
+    try:
+        async for message in messages:
+            pending.append((message, asyncio.create_task(mirror.resolve_all(asset_urls(message)))))
+            if len(pending) >= TRANSCRIPT_ASSET_WINDOW:
+                message, task = pending.popleft()
+                yield message, await task
+        while pending:
+            message, task = pending.popleft()
+            yield message, await task
+    finally:
+        # The history failed or the consumer stopped early, don't leave downloads running in the background
+        tasks = [task for _, task in pending]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+class TranscriptStats:
+    count: int
+    last_message_id: int | None
+    paths: List[str]
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.last_message_id = None
+        self.paths = []
+
+
+async def render_transcript(
+    messageable: discord.TextChannel | discord.Thread,
+    paths: Dict[str, str],
+    after: int | None = None,
+    mirror: AssetMirror | None = None,
+    indexer: SearchIndexer | None = None,
+) -> TranscriptStats:
+    """Writes the history of a channel or thread into one file per output format, oldest message first.
+
+    The history is only fetched once, however many formats are written.
+
+    Args:
+        messageable (discord.TextChannel | discord.Thread): The channel or thread to transcribe
+        paths (Dict[str, str]): The file to write for each output format, e.g. {"html": "general.html"}
+        after (int | None): If set, only messages after this message ID are appended to the existing files
+        mirror (AssetMirror | None): If set, avatars and attachments reference their mirrored copies
+        indexer (SearchIndexer | None): If set, every written message is also added to the search index
+
+    Returns:
+        TranscriptStats: The number of messages written, the ID of the last one and the written files
+    """
+    stats = TranscriptStats()
+    stats.paths = list(paths.values())
+    with ExitStack() as stack:
+        writers: List[TranscriptWriter] = []
+        for name, path in paths.items():
+            writer = FORMATS[name](path, append=after is not None)
+            stack.callback(writer.close)
+            writers.append(writer)
+            if after is None:
+                writer.write_header(messageable)
+        messages = messageable.history(
+            limit=None,
+            after=None if after is None else discord.Object(id=after),
+            oldest_first=True,
+        )
+        # Closed right away if a writer or the indexer fails, which cancels the pending downloads
+        async with aclosing(_with_assets(messages, mirror)) as messages_with_assets:
+            async for message, assets in messages_with_assets:
+                for writer in writers:
+                    writer.write_message(message, assets)
+                if indexer is not None:
+                    await indexer.add(message)
+                stats.count += 1
+                stats.last_message_id = message.id
+    if indexer is not None:
+        await indexer.flush()
+    return stats
@@ -0,0 +1,176 @@
+"""Full-text search over exported transcripts
+
+Exports feed every message into the `transcript_messages` table, which the `transcript_search` SQLite FTS5 table
+indexes as external content (both are created by the database migrations). /transcriptsearch queries the index,
+ranked by relevance (BM25), and only returns messages from channels the member searching can read.
+
+Classes:
+    SearchIndexer: Adds exported messages to the search index in batches.
+    SearchResult: A message matching a search.
+
+Functions:
+    readable_channels: Returns the channels whose exported messages a member may search.
+    search_transcripts: Searches the exported messages of a guild.
+"""
+from typing import Any, Dict, List, Tuple
+
+import discord
+from sqlalchemy import bindparam, text
+
+from ...config.transcript_config import TRANSCRIPT_SEARCH_BATCH_SIZE, TRANSCRIPT_SEARCH_PAGE_SIZE
+from ...database import run_in_session
+
+_INSERT = text(
+    "INSERT INTO transcript_messages "
+    "(content, author, channel, guildId, channelId, parentId, private, messageId, timestamp) "
+    "VALUES (:content, :author, :channel, :guildId, :channelId, :parentId, :private, :messageId, :timestamp)"
+)
+# Uses the channelId index, the FTS index is updated by a trigger
+_DELETE_CHANNEL = text("DELETE FROM transcript_messages WHERE channelId = :channelId")
+_SEARCH = text(
+    "SELECT message.channel, message.author, snippet(transcript_search, 0, '**', '**', '…', 16), "
+    "message.channelId, message.messageId, message.timestamp "
+    "FROM transcript_search JOIN transcript_messages AS message ON message.id = transcript_search.rowid "
+    "WHERE transcript_search MATCH :query AND message.guildId = :guildId "
+    "AND message.parentId IN :channelIds AND (message.private = 0 OR message.parentId IN :privateChannelIds) "
+    "ORDER BY rank LIMIT :limit OFFSET :offset"
+).bindparams(bindparam("channelIds", expanding=True), bindparam("privateChannelIds", expanding=True))
+
+class SearchIndexer:
+    """Adds the messages of one channel or thread to the search index, committing every `batch_size` messages.
+
+    A full export replaces whatever was indexed for the channel before, an incremental export only adds to it.
+    """
+    messageable: discord.TextChannel | discord.Thread
+    batch_size: int
+    _rows: List[Dict[str, Any]]
+    _replace: bool
+    _parent_id: int
+    _private: bool
+
+    def __init__(
+        self,
+        messageable: discord.TextChannel | discord.Thread,
+        replace: bool = True,
+        batch_size: int = TRANSCRIPT_SEARCH_BATCH_SIZE,
+    ) -> None:
+        self.messageable = messageable
+        self.batch_size = batch_size
+        self._rows = []
+        self._replace = replace
+        # Search results are filtered by the permissions of the channel, or of the parent channel of a thread
+        self._parent_id = messageable.id
+        self._private = False
+        if isinstance(messageable, discord.Thread):
+            self._parent_id = messageable.parent_id
+            self._private = messageable.type == discord.ChannelType.private_thread
+
+    async def add(self, message: discord.Message) -> None:
+        self._rows.append(
+            {
+                "content": message.content,
+                "author": message.author.name,
+                "channel": self.messageable.name,
+                "guildId": self.messageable.guild.id,
+                "channelId": self.messageable.id,
+                "parentId": self._parent_id,
+                "private": self._private,
+                "messageId": message.id,
+                "timestamp": round(message.created_at.timestamp()),
+            }
+        )
+        if len(self._rows) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self) -> None:
+        rows, self._rows = self._rows, []
+        replace, self._replace = self._replace, False
+        if not rows and not replace:
+            return
+
+        def write(session) -> None:
+            if replace:
+                session.execute(_DELETE_CHANNEL, {"channelId": self.messageable.id})
+            if rows:
+                session.execute(_INSERT, rows)
+
+        await run_in_session(write)
+
+
+class SearchResult:
+    channel: str
+    author: str
+    snippet: str
+    channel_id: int
+    message_id: int
+    timestamp: int
+
+    def __init__(
+        self, channel: str, author: str, snippet: str, channel_id: int, message_id: int, timestamp: int
+    ) -> None:
+        self.channel = channel
+        self.author = author
+        self.snippet = snippet
+        self.channel_id = channel_id
+        self.message_id = message_id
+        self.timestamp = timestamp
+
+
+def _to_match_expression(query: str) -> str:
+    # Quote every word, so user input is always matched literally instead of being parsed as FTS5 syntax
+    return " ".join('"' + word.replace('"', '""') + '"' for word in query.split())
+
+
+def readable_channels(member: discord.Member) -> Tuple[List[int], List[int]]:
+    """Returns the channels of a member's guild whose exported messages the member may search.
+
+    Returns:
+        List[int]: The channels whose history the member can read, including their public threads
+        List[int]: The channels whose private threads the member can read as well
+    """
+    channel_ids: List[int] = []
+    private_channel_ids: List[int] = []
+    for channel in member.guild.channels:
+        permissions = channel.permissions_for(member)
+        if not (permissions.read_messages and permissions.read_message_history):
+            continue
+        channel_ids.append(channel.id)
+        if permissions.manage_threads:
+            private_channel_ids.append(channel.id)
+    return channel_ids, private_channel_ids
+
+
+async def search_transcripts(
+    member: discord.Member, query: str, offset: int = 0, limit: int = TRANSCRIPT_SEARCH_PAGE_SIZE
+) -> List[SearchResult]:
+    """Searches the exported messages of a member's guild, best matches first.
+
+    Only messages from channels the member can read are returned, see readable_channels.
+
+    Args:
+        member (discord.Member): Who is searching, in the guild whose transcripts to search
+        query (str): The words to search for, messages must contain all of them
+        offset (int): How many of the best matches to skip
+        limit (int): How many matches to return at most
+
+    Returns:
+        List[SearchResult]: The matching messages
+    """
+    expression = _to_match_expression(query)
+    if not expression:
+        return []
+    channel_ids, private_channel_ids = readable_channels(member)
+    rows = await run_in_session(
+        lambda session: session.execute(
+            _SEARCH,
+            {
+                "query": expression,
+                "guildId": member.guild.id,
+                "channelIds": channel_ids,
+                "privateChannelIds": private_channel_ids,
+                "limit": limit,
+                "offset": offset,
+            },
+        ).all()
+    )
+    return [SearchResult(*row) for row in rows]
@@ -0,0 +1,12 @@
+"""Provides the administration module's configuration data
+
+Attributes:
+    WARNINGS_PAGE_SIZE (int): How many warnings /warnings shows per page
+    WARNINGS_REASON_LENGTH (int): Reasons longer than this are truncated, so a page always fits in one message
+    WARNINGS_VIEW_TIMEOUT (float): How many seconds the page buttons stay active
+"""
+from decouple import config
+
+WARNINGS_PAGE_SIZE: int = config("eternal_warnings_page_size", 10, cast=int) # type: ignore
+WARNINGS_REASON_LENGTH: int = config("eternal_warnings_reason_length", 150, cast=int) # type: ignore
+WARNINGS_VIEW_TIMEOUT: float = config("eternal_warnings_view_timeout", 180.0, cast=float) # type: ignore
@@ -1,41 +1,28 @@
 """Provides the automod module's configuration data
 
+Words are normalized before matching (see `events.normalization`), so casing, homoglyphs, leetspeak and
+separators don't need their own entries. e.g. "fag" also matches "F A G", "f@g" and "fаg" (Cyrillic "а").
+Words only match within a word of the message, or across several for entries with spaces, e.g. "flag got".
+
 Attributes:
     BANNED_WORDS (List[str])
+    NORMALIZATION_CACHE_SIZE (int): How many normalized messages to keep in the LRU cache
 """
 from typing import List
 
+from decouple import config
+
 # TODO: Consider loading this from DB or a static file in the bot's home/root folder
 BANNED_WORDS: List[str] = [
-    "^FAGGOT",
-    "^TRANNY",
-    "f a g",
-    "f ag",
-    "fa g",
     "fag",
-    "FAG",
-    "FAGGOT",
+    "faggot",
+    "f*gg*t",
     "flag got",
-    "flaggot",
-    "fаggot",
-    "FАGGOТ",
     "gaF backwards",
     "tranny",
-    "*TRANNY*",
-    "TRANNY",
-    "TRANNУ",
-    "trаnny",
-    "!f!a!g!",
-    "!fag",
-    "*fag",
-    "fag!",
-    "faggot",
-    "FAGGOT",
-    "f*gg*t",
-    "fаg",
     "trannny",
-    "tranny",
-    "TRANNY",
     "ladyboy",
     "libtard"
 ]
+
+NORMALIZATION_CACHE_SIZE: int = config("eternal_automod_cache_size", 4096, cast=int) # type: ignore
@@ -0,0 +1,15 @@
+"""Provides the ban expiry module's configuration data
+
+Attributes:
+    BAN_EXPIRY_BATCH_SIZE (int): How many expired bans are lifted at once
+    BAN_EXPIRY_MAX_SLEEP (float): The longest the scheduler sleeps before re-checking the clock, in seconds
+    BAN_EXPIRY_RETRY_DELAY (float): How long to wait before retrying a ban which failed to lift, in seconds,
+        doubled after every failed attempt
+    BAN_EXPIRY_MAX_RETRY_DELAY (float): The longest to wait between retries, in seconds
+"""
+from decouple import config
+
+BAN_EXPIRY_BATCH_SIZE: int = config("eternal_ban_expiry_batch_size", 50, cast=int) # type: ignore
+BAN_EXPIRY_MAX_SLEEP: float = config("eternal_ban_expiry_max_sleep", 3600.0, cast=float) # type: ignore
+BAN_EXPIRY_RETRY_DELAY: float = config("eternal_ban_expiry_retry_delay", 30.0, cast=float) # type: ignore
+BAN_EXPIRY_MAX_RETRY_DELAY: float = config("eternal_ban_expiry_max_retry_delay", 3600.0, cast=float) # type: ignore
@@ -0,0 +1,33 @@
+"""Provides the database module's configuration data
+
+Attributes:
+    DATABASE_URL (str): The SQLite database to connect to, other databases aren't supported
+    DATABASE_POOL_SIZE (int): How many connections are kept open
+    DATABASE_POOL_OVERFLOW (int): How many extra connections may be opened under load
+    SQLITE_PROFILE (bool): Whether to apply the SQLite pragmas below on connect
+    SQLITE_JOURNAL_MODE (str): WAL lets readers proceed while a write is in progress
+    SQLITE_SYNCHRONOUS (str): NORMAL only syncs on checkpoints when in WAL mode
+    SQLITE_MMAP_SIZE (int): How many bytes of the database file to memory-map
+    SQLITE_CACHE_SIZE (int): Page cache size, negative values are in KiB
+    SQLITE_BUSY_TIMEOUT (int): How many milliseconds to wait for a lock before failing
+    DATABASE_THREADS (int): How many threads run queries awaited from the event loop
+    WRITE_BEHIND_BATCH_SIZE (int): How many queued rows trigger a flush
+    WRITE_BEHIND_FLUSH_INTERVAL (float): How many seconds queued rows may wait before being flushed
+"""
+from decouple import config
+
+DATABASE_URL: str = config("eternal_db_url", "sqlite:///database.db") # type: ignore
+DATABASE_POOL_SIZE: int = config("eternal_db_pool_size", 5, cast=int) # type: ignore
+DATABASE_POOL_OVERFLOW: int = config("eternal_db_pool_overflow", 5, cast=int) # type: ignore
+
+SQLITE_PROFILE: bool = config("eternal_sqlite_profile", True, cast=bool) # type: ignore
+SQLITE_JOURNAL_MODE: str = config("eternal_sqlite_journal_mode", "WAL") # type: ignore
+SQLITE_SYNCHRONOUS: str = config("eternal_sqlite_synchronous", "NORMAL") # type: ignore
+SQLITE_MMAP_SIZE: int = config("eternal_sqlite_mmap_size", 256 * 1024 * 1024, cast=int) # type: ignore
+SQLITE_CACHE_SIZE: int = config("eternal_sqlite_cache_size", -64 * 1024, cast=int) # type: ignore
+SQLITE_BUSY_TIMEOUT: int = config("eternal_sqlite_busy_timeout", 5000, cast=int) # type: ignore
+
+DATABASE_THREADS: int = config("eternal_db_threads", 2, cast=int) # type: ignore
+
+WRITE_BEHIND_BATCH_SIZE: int = config("eternal_db_batch_size", 50, cast=int) # type: ignore
+WRITE_BEHIND_FLUSH_INTERVAL: float = config("eternal_db_flush_interval", 2.0, cast=float) # type: ignore
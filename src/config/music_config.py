@@ -5,3 +5,27 @@ from decouple import config
 CACHE_DIR: str = config("BOT_CACHE_DIR", None)
 if CACHE_DIR is None:
     CACHE_DIR = "./cache"
+# Least recently used fragments are deleted once the cache grows past this many bytes
+CACHE_MAX_BYTES: int = config("BOT_CACHE_MAX_BYTES", 2 * 1024 * 1024 * 1024, cast=int)
+
+# Metadata fetches and fragment downloads share this many worker threads
+MUSIC_WORKERS: int = config("BOT_MUSIC_WORKERS", 4, cast=int)
+
+# Cached metadata is fetched again after this many days, and the least recently used entries beyond the cap are evicted
+MUSIC_META_TTL_DAYS: int = config("BOT_MUSIC_META_TTL_DAYS", 30, cast=int)
+MUSIC_META_MAX_ENTRIES: int = config("BOT_MUSIC_META_MAX_ENTRIES", 10000, cast=int)
+
+# "file" downloads every fragment into the cache before playing it,
+# "stream" has FFmpeg read fragments straight from the song's stream URL, without touching the disk
+MUSIC_PLAYBACK_MODE: str = config("BOT_MUSIC_PLAYBACK_MODE", "file")
+
+# Fragments start short so playback starts quickly, then grow by MUSIC_FRAGMENT_GROWTH up to MUSIC_FRAGMENT_MAX seconds,
+# but never faster than the measured download speed allows
+MUSIC_FRAGMENT_MIN: int = config("BOT_MUSIC_FRAGMENT_MIN", 20, cast=int)
+MUSIC_FRAGMENT_MAX: int = config("BOT_MUSIC_FRAGMENT_MAX", 600, cast=int)
+MUSIC_FRAGMENT_GROWTH: float = config("BOT_MUSIC_FRAGMENT_GROWTH", 2.0, cast=float)
+# Weight of the latest download in the download speed average
+MUSIC_THROUGHPUT_ALPHA: float = config("BOT_MUSIC_THROUGHPUT_ALPHA", 0.3, cast=float)
+
+# How long a resolved stream URL is used for if it doesn't state its own expiry, in seconds
+MUSIC_STREAM_TTL: int = config("BOT_MUSIC_STREAM_TTL", 3600, cast=int)
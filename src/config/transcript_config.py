@@ -1,40 +1,39 @@
-from ast import Name
+from decouple import config
 
+# Bytes buffered in memory before a transcript is written to disk
+TRANSCRIPT_WRITE_BUFFER: int = config("eternal_transcript_write_buffer", 1024 * 1024, cast=int) # type: ignore
+# How many threads /transcriptthreads transcribes at the same time
+TRANSCRIPT_THREAD_CONCURRENCY: int = config("eternal_transcript_thread_concurrency", 4, cast=int) # type: ignore
+# How many transcript commands may run at the same time, and how many more may wait for their turn
+TRANSCRIPT_JOB_CONCURRENCY: int = config("eternal_transcript_job_concurrency", 2, cast=int) # type: ignore
+TRANSCRIPT_JOB_QUEUE_SIZE: int = config("eternal_transcript_job_queue_size", 10, cast=int) # type: ignore
+# How many jobs /transcriptjobs remembers
+TRANSCRIPT_JOB_HISTORY: int = config("eternal_transcript_job_history", 25, cast=int) # type: ignore
+# Minimum number of seconds between progress updates
+TRANSCRIPT_PROGRESS_INTERVAL: float = config("eternal_transcript_progress_interval", 5.0, cast=float) # type: ignore
+# Transcripts are sent as zip archives of at most this many bytes
+TRANSCRIPT_UPLOAD_LIMIT: int = config("eternal_transcript_upload_limit", 8 * 1024 * 1024, cast=int) # type: ignore
+TRANSCRIPT_COMPRESSION_LEVEL: int = config("eternal_transcript_compression_level", 6, cast=int) # type: ignore
+# Every exported transcript is kept here, so later exports only need to fetch new messages
+TRANSCRIPT_ARCHIVE_DIR: str = config("eternal_transcript_archive_dir", "./transcripts") # type: ignore
+# Formats sent when a command doesn't choose any, comma separated: html, jsonl, md
+TRANSCRIPT_FORMATS: str = config("eternal_transcript_formats", "html") # type: ignore
 
-async def createHeader(nameOfTranscript: str):
-    header = """
-        <head> 
-            <meta charset="UTF-8"> 
-            <meta name="viewport" 
-            content="width=device-width, 
-            initial-scale=1.0"> 
-            <title>Transcript of """ + nameOfTranscript + """</title> 
-            <style>
-            @import url('https://fonts.googleapis.com/css2?family=Roboto:wght@300&display=swap');
+# Mirror avatars and attachments into a local content-addressed cache, see commands/transcript/assets.py
+TRANSCRIPT_MIRROR_ASSETS: bool = config("eternal_transcript_mirror_assets", False, cast=bool) # type: ignore
+TRANSCRIPT_ASSET_DIR: str = config("eternal_transcript_asset_dir", "./transcripts/assets") # type: ignore
+# Prefix of mirrored asset references, relative to the archived transcripts by default.
+# Relative references are resolved by bundling the referenced assets along with the transcripts
+TRANSCRIPT_ASSET_BASE_URL: str = config("eternal_transcript_asset_base_url", "assets") # type: ignore
+TRANSCRIPT_ASSET_CONCURRENCY: int = config("eternal_transcript_asset_concurrency", 8, cast=int) # type: ignore
+TRANSCRIPT_ASSET_MAX_BYTES: int = config("eternal_transcript_asset_max_bytes", 25 * 1024 * 1024, cast=int) # type: ignore
+# Seconds before an asset which failed to download, or was too large, is tried again
+TRANSCRIPT_ASSET_RETRY_AFTER: float = config("eternal_transcript_asset_retry_after", 3600.0, cast=float) # type: ignore
+# How many messages ahead of the writer assets are downloaded
+TRANSCRIPT_ASSET_WINDOW: int = config("eternal_transcript_asset_window", 64, cast=int) # type: ignore
 
-            :root {
-                --dark-bg: #36393f;
-                --dark-server-list: #202225;
-                --server-divider: #2d2f32;
-                --blurple: #7289da;
-                --dark-blurple: #4d5e94;
-                --green: #43b581;
-                --dark-primary: #2f3136;
-                --text-gray: #dcddde;
-                --user-box: #292B2F;
-                --iconColor: #b9bbbe;
-                --red: #dd4444;
-            }
+# Index exported messages for /transcriptsearch
+TRANSCRIPT_SEARCH_INDEX: bool = config("eternal_transcript_search_index", True, cast=bool) # type: ignore
+TRANSCRIPT_SEARCH_BATCH_SIZE: int = config("eternal_transcript_search_batch_size", 500, cast=int) # type: ignore
+TRANSCRIPT_SEARCH_PAGE_SIZE: int = config("eternal_transcript_search_page_size", 10, cast=int) # type: ignore
 
-            body {
-                margin: 0;
-                padding: 0;
-                background-color: var(--dark-bg);
-                color: #FFFFFF;
-                font-family: 'Roboto', sans-serif;
-            }
-            </style>
-            <script src="script.js" defer></script> 
-        </head>
-    """
-    return header
\ No newline at end of file
@@ -1 +1,2 @@
-from .database import get_session
+from .database import get_session, run_in_session
+from .write_behind import WriteBehindQueue
@@ -1,24 +1,99 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
+from typing import Callable, TypeVar
 
-from sqlalchemy import create_engine
+from sqlalchemy import Engine, create_engine, event, make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
+from ..config.database_config import (
+    DATABASE_POOL_OVERFLOW,
+    DATABASE_POOL_SIZE,
+    DATABASE_THREADS,
+    DATABASE_URL,
+    SQLITE_BUSY_TIMEOUT,
+    SQLITE_CACHE_SIZE,
+    SQLITE_JOURNAL_MODE,
+    SQLITE_MMAP_SIZE,
+    SQLITE_PROFILE,
+    SQLITE_SYNCHRONOUS,
+)
+
+T = TypeVar("T")
+
+
+def _apply_sqlite_profile(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        # Pragmas can't be parameterized, the values come from our own config
+        cursor.execute(f"PRAGMA journal_mode = {SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous = {SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA mmap_size = {int(SQLITE_MMAP_SIZE)}")
+        cursor.execute(f"PRAGMA cache_size = {int(SQLITE_CACHE_SIZE)}")
+        cursor.execute(f"PRAGMA busy_timeout = {int(SQLITE_BUSY_TIMEOUT)}")
+    finally:
+        cursor.close()
+
+
+def create_database_engine(url: str = DATABASE_URL, profile: bool = SQLITE_PROFILE) -> Engine:
+    """Creates an engine for the database, applying the SQLite storage profile to every new connection.
+
+    Only SQLite is supported: the upserts, the migrations and the transcript search index all use
+    SQLite-specific SQL.
+
+    Args:
+        url (str): The database URL
+        profile (bool): Whether to apply the pragmas from database_config
+
+    Raises:
+        ValueError: If the URL isn't an SQLite database
+
+    Returns:
+        Engine: The engine
+    """
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "sqlite":
+        raise ValueError(f"Only SQLite databases are supported, not {parsed.get_backend_name()}")
+    pool_options = dict()
+    # In-memory databases use a SingletonThreadPool, which takes no size
+    if parsed.database not in (None, "", ":memory:"):
+        pool_options = dict(pool_size=DATABASE_POOL_SIZE, max_overflow=DATABASE_POOL_OVERFLOW)
+    new_engine = create_engine(url, echo=False, logging_name="sqlalchemy", **pool_options)
+    if profile:
+        event.listen(new_engine, "connect", _apply_sqlite_profile)
+    return new_engine
+
+
 # Create engine
-engine = create_engine("sqlite:///database.db", echo=False, logging_name="sqlalchemy")
+engine = create_database_engine()
 
 # Create session maker
 Session = sessionmaker(bind=engine)
+# Sessions used by run_in_session hand their results back to another thread after closing,
+# so loaded attributes must not be expired on commit
+DetachedSession = sessionmaker(bind=engine, expire_on_commit=False)
+
+# Queries awaited from the event loop run here instead
+executor = ThreadPoolExecutor(
+    max_workers=DATABASE_THREADS, thread_name_prefix="Eternal.database"
+)
 
 # Create declarative base
 Base = declarative_base()
 
 # Import models here
 from .models.ban import BanModel  # noqa
+from .models.music_meta import MusicMetaModel  # noqa
+from .models.transcript_checkpoint import TranscriptCheckpointModel  # noqa
 from .models.warning import WarningModel  # noqa
+from .models.warning_count import WarningCountModel  # noqa
+
+# Create tables, then upgrade the ones which already existed
+from .migrations import migrate  # noqa
 
-# Create tables
 Base.metadata.create_all(engine)
+migrate(engine)
 
 
 # Function to get a session with rollback capability
@@ -33,3 +108,38 @@ def get_session() -> Session: # type: ignore
         raise e
     finally:
         session.close()
+
+
+def _call_in_session(func: Callable[[Session], T]) -> T:  # type: ignore
+    session = DetachedSession()
+    try:
+        result = func(session)
+        session.commit()
+        return result
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+
+
+async def run_in_session(func: Callable[[Session], T]) -> T:  # type: ignore
+    """Runs a function with a session on the database thread, without blocking the event loop.
+
+    The session is committed once the function returns, or rolled back if it raises.
+    Returned models are detached, but keep every attribute loaded by the function.
+
+    Args:
+        func (Callable[[Session], T]): The function to run, it receives the session as its only argument
+
+    Returns:
+        T: The function's return value
+
+    Example:
+        warnings = await run_in_session(
+            lambda session: session.query(WarningModel).filter_by(memberId=member.id).all()
+        )
+    """
+    return await asyncio.get_running_loop().run_in_executor(
+        executor, _call_in_session, func
+    )
@@ -0,0 +1,164 @@
+"""Schema migrations for existing databases
+
+`Base.metadata.create_all` creates missing tables, but never alters tables which already exist.
+Changes to existing tables are made here instead, and applied in order on startup.
+The schema version is stored in SQLite's `user_version` pragma.
+
+New migrations must be appended to the end of the list, and must be safe to run on a database freshly created by
+`create_all` (e.g. `CREATE INDEX IF NOT EXISTS`).
+
+Functions:
+    migrate: Upgrades the database to the latest schema version.
+"""
+import json
+import logging
+from typing import Callable, List
+
+from sqlalchemy import Connection, Engine
+
+logger: logging.Logger = logging.getLogger("Eternal.database")
+
+MIGRATIONS: List[Callable[[Connection], None]] = []
+
+
+def _add_column(connection: Connection, table: str, column: str, type_: str) -> None:
+    # Tables created by create_all already have every column, only add it to older tables
+    columns = [row[1] for row in connection.exec_driver_sql(f"PRAGMA table_info({table})")]
+    if column not in columns:
+        connection.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {column} {type_}")
+
+
+def migration(func: Callable[[Connection], None]) -> Callable[[Connection], None]:
+    """Registers a function as the next migration"""
+    MIGRATIONS.append(func)
+    return func
+
+
+@migration
+def add_member_time_indexes(connection: Connection) -> None:
+    connection.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_warnings_memberId_time ON warnings (memberId, time DESC)"
+    )
+    connection.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_bans_memberId_time ON bans (memberId, time DESC)"
+    )
+    connection.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_bans_expires ON bans (expires)"
+    )
+
+
+@migration
+def add_warning_keyset_index(connection: Connection) -> None:
+    # Adds warningId as a tie breaker, so keyset pagination doesn't need to sort
+    connection.exec_driver_sql("DROP INDEX IF EXISTS ix_warnings_memberId_time")
+    connection.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_warnings_memberId_time_warningId "
+        "ON warnings (memberId, time DESC, warningId DESC)"
+    )
+
+
+@migration
+def backfill_warning_counts(connection: Connection) -> None:
+    connection.exec_driver_sql(
+        "INSERT OR REPLACE INTO warning_counts (memberId, count) "
+        "SELECT memberId, COUNT(*) FROM warnings GROUP BY memberId"
+    )
+
+
+@migration
+def add_ban_expiry_columns(connection: Connection) -> None:
+    _add_column(connection, "bans", "guildId", "INTEGER")
+    _add_column(connection, "bans", "liftedAt", "DATETIME")
+
+
+@migration
+def add_transcript_search(connection: Connection) -> None:
+    # Full-text index over exported messages, see commands/transcript/search.py
+    connection.exec_driver_sql(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS transcript_search USING fts5("
+        "content, author, channel, "
+        "guildId UNINDEXED, channelId UNINDEXED, messageId UNINDEXED, timestamp UNINDEXED, "
+        "tokenize = 'unicode61 remove_diacritics 2')"
+    )
+
+
+@migration
+def add_music_meta_eviction(connection: Connection) -> None:
+    _add_column(connection, "music_meta", "created", "DATETIME")
+    _add_column(connection, "music_meta", "accessed", "DATETIME")
+    connection.exec_driver_sql(
+        "UPDATE music_meta SET created = datetime('now', 'localtime'), accessed = datetime('now', 'localtime') "
+        "WHERE created IS NULL"
+    )
+    connection.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_music_meta_accessed ON music_meta (accessed)"
+    )
+    # Trim cached yt-dlp info down to the fields music uses, keep in sync with compact_info in music/models/song.py
+    fields = ("id", "webpage_url", "original_url", "title", "channel", "uploader_url", "channel_url", "duration")
+
+    def compact(info: dict) -> dict:
+        if info.get("entries") is not None:
+            return {"entries": [compact(entry) for entry in info["entries"] if entry is not None]}
+        return {field: info[field] for field in fields if info.get(field) is not None}
+
+    rows = connection.exec_driver_sql("SELECT id, data FROM music_meta").all()
+    if rows:
+        connection.exec_driver_sql(
+            "UPDATE music_meta SET data = ? WHERE id = ?",
+            [(json.dumps(compact(json.loads(data))), id) for id, data in rows],
+        )
+
+
+@migration
+def add_transcript_search_messages(connection: Connection) -> None:
+    # Messages move into a plain table, which the FTS index references as external content. Deleting a channel's
+    # messages then uses the channelId index, and triggers remove exactly those rows from the FTS index.
+    connection.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS transcript_messages ("
+        "id INTEGER PRIMARY KEY, content TEXT, author TEXT, channel TEXT, guildId INTEGER, channelId INTEGER, "
+        "parentId INTEGER, private INTEGER NOT NULL DEFAULT 0, messageId INTEGER, timestamp INTEGER)"
+    )
+    connection.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_transcript_messages_channelId ON transcript_messages (channelId)"
+    )
+    # The parent of older rows is unknown, results from threads are hidden until the thread is exported again
+    connection.exec_driver_sql(
+        "INSERT INTO transcript_messages "
+        "(content, author, channel, guildId, channelId, parentId, messageId, timestamp) "
+        "SELECT content, author, channel, guildId, channelId, channelId, messageId, timestamp FROM transcript_search"
+    )
+    connection.exec_driver_sql("DROP TABLE transcript_search")
+    connection.exec_driver_sql(
+        "CREATE VIRTUAL TABLE transcript_search USING fts5("
+        "content, author, channel, content = 'transcript_messages', content_rowid = 'id', "
+        "tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    connection.exec_driver_sql(
+        "CREATE TRIGGER IF NOT EXISTS transcript_messages_insert AFTER INSERT ON transcript_messages BEGIN "
+        "INSERT INTO transcript_search (rowid, content, author, channel) "
+        "VALUES (new.id, new.content, new.author, new.channel); END"
+    )
+    connection.exec_driver_sql(
+        "CREATE TRIGGER IF NOT EXISTS transcript_messages_delete AFTER DELETE ON transcript_messages BEGIN "
+        "INSERT INTO transcript_search (transcript_search, rowid, content, author, channel) "
+        "VALUES ('delete', old.id, old.content, old.author, old.channel); END"
+    )
+    connection.exec_driver_sql("INSERT INTO transcript_search (transcript_search) VALUES ('rebuild')")
+
+
+def migrate(engine: Engine) -> None:
+    """Upgrades the database to the latest schema version.
+
+    Each migration runs in its own transaction, together with the version bump.
+
+    Args:
+        engine (Engine): The engine of the database to upgrade
+    """
+    with engine.connect() as connection:
+        version: int = connection.exec_driver_sql("PRAGMA user_version").scalar()  # type: ignore
+    for number, func in enumerate(MIGRATIONS[version:], start=version + 1):
+        logger.info("Migrating database to version %d (%s)", number, func.__name__)
+        with engine.begin() as connection:
+            func(connection)
+            # Pragmas can't be parameterized, number is always an int
+            connection.exec_driver_sql(f"PRAGMA user_version = {number}")
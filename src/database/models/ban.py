@@ -1,19 +1,27 @@
 from ..database import Base
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, String, DateTime, Index
 from discord import Member
 from datetime import datetime
 
 class BanModel(Base):
     __tablename__ = 'bans'
     banId = Column(Integer, primary_key=True)
+    guildId = Column(Integer, nullable=True) # Bans created before this column existed have no guild
     memberId = Column(Integer)
     moderatorId = Column(Integer)
     reason = Column(String)
     time = Column(DateTime)
     expires = Column(DateTime, nullable=True) # Default is None
+    liftedAt = Column(DateTime, nullable=True) # Set once an expired ban has been lifted
     def __init__(self, member: Member, moderator: Member, reason: str, expires: DateTime | None = None):
+        self.guildId = member.guild.id
         self.memberId = member.id
         self.moderatorId = moderator.id
         self.reason = reason
         self.time = datetime.now()
         self.expires = expires
+        self.liftedAt = None
+
+# Existing databases receive these through migrations.py, keep the two in sync
+Index("ix_bans_memberId_time", BanModel.memberId, BanModel.time.desc())
+Index("ix_bans_expires", BanModel.expires)
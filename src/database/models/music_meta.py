@@ -0,0 +1,19 @@
+from ..database import Base
+from sqlalchemy import Column, String, JSON, DateTime, Index
+from datetime import datetime
+
+class MusicMetaModel(Base):
+    """Cached metadata of a video or playlist, keyed by its YouTube ID"""
+    __tablename__ = 'music_meta'
+    id = Column(String, primary_key=True)
+    data = Column(JSON, nullable=False)
+    created = Column(DateTime, nullable=False) # Entries expire a while after they were fetched
+    accessed = Column(DateTime, nullable=False) # The least recently accessed entries are evicted first
+    def __init__(self, id: str, data: dict):
+        self.id = id
+        self.data = data
+        self.created = datetime.now()
+        self.accessed = self.created
+
+# Existing databases receive this through migrations.py, keep the two in sync
+Index("ix_music_meta_accessed", MusicMetaModel.accessed)
@@ -0,0 +1,14 @@
+from ..database import Base
+from sqlalchemy import Column, Integer, DateTime
+from datetime import datetime
+
+class TranscriptCheckpointModel(Base):
+    """The last message exported from a channel or thread, incremental exports continue after it"""
+    __tablename__ = 'transcript_checkpoints'
+    channelId = Column(Integer, primary_key=True)
+    lastMessageId = Column(Integer)
+    time = Column(DateTime)
+    def __init__(self, channel_id: int, last_message_id: int):
+        self.channelId = channel_id
+        self.lastMessageId = last_message_id
+        self.time = datetime.now()
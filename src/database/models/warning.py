@@ -1,5 +1,5 @@
 from ..database import Base
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, String, DateTime, Index
 from discord import Member
 from datetime import datetime
 
@@ -15,3 +15,12 @@ class WarningModel(Base):
         self.moderatorId = moderator.id
         self.reason = reason
         self.time = datetime.now()
+
+# Serves the latest-first, keyset-paginated listing of /warnings
+# Existing databases receive it through migrations.py, keep the two in sync
+Index(
+    "ix_warnings_memberId_time_warningId",
+    WarningModel.memberId,
+    WarningModel.time.desc(),
+    WarningModel.warningId.desc(),
+)
@@ -0,0 +1,36 @@
+from collections import Counter
+
+from ..database import Base
+from .warning import WarningModel
+from sqlalchemy import Column, Integer, event
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+class WarningCountModel(Base):
+    """Number of warnings per member, kept up to date whenever warnings are added or deleted through the ORM"""
+    __tablename__ = 'warning_counts'
+    memberId = Column(Integer, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+@event.listens_for(Session, "before_flush")
+def _update_warning_counts(session: Session, flush_context, instances) -> None:
+    counts = Counter()
+    for obj in session.new:
+        if isinstance(obj, WarningModel):
+            counts[obj.memberId] += 1
+    for obj in session.deleted:
+        if isinstance(obj, WarningModel):
+            counts[obj.memberId] -= 1
+    counts = {member_id: delta for member_id, delta in counts.items() if delta != 0}
+    if not counts:
+        return
+    # Runs in the same transaction as the flush, so the counts can't drift from the warnings table
+    statement = insert(WarningCountModel).values(
+        [{"memberId": member_id, "count": delta} for member_id, delta in counts.items()]
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=[WarningCountModel.memberId],
+        set_={"count": WarningCountModel.count + statement.excluded["count"]},
+    )
+    session.execute(statement)
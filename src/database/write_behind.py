@@ -0,0 +1,172 @@
+"""Write-behind persistence for records which don't need to be committed immediately
+
+Rows are queued from the event loop without blocking, and committed in batches by a worker thread, either once enough
+rows are queued or once the oldest queued row has waited long enough. A batch which fails to commit is retried once.
+Rows added after the queue was closed are committed right away instead.
+
+Classes:
+    WriteBehindQueue: Batches model instances and commits them in a worker thread.
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+from typing import Any, List
+
+from ..config.database_config import WRITE_BEHIND_BATCH_SIZE, WRITE_BEHIND_FLUSH_INTERVAL
+from .database import get_session
+
+logger: logging.Logger = logging.getLogger("Eternal.database")
+
+# Marks the end of the queue, the worker flushes and exits once it reaches it
+_STOP = object()
+
+# Seconds to wait before retrying a batch which failed to commit
+_RETRY_DELAY: float = 1.0
+
+
+class WriteBehindQueue:
+    name: str
+    batch_size: int
+    flush_interval: float
+    _queue: queue.Queue
+    _thread: threading.Thread | None
+    _lock: threading.Lock
+    _closed: bool
+    _pending: int
+    _flushed: int
+
+    def __init__(
+        self,
+        name: str,
+        batch_size: int = WRITE_BEHIND_BATCH_SIZE,
+        flush_interval: float = WRITE_BEHIND_FLUSH_INTERVAL,
+    ) -> None:
+        self.name = name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._closed = False
+        self._pending = 0
+        self._flushed = 0
+
+    @property
+    def pending(self) -> int:
+        """The number of rows which are queued, but not yet committed"""
+        return self._pending
+
+    @property
+    def flushed(self) -> int:
+        """The number of rows committed since the queue was created"""
+        return self._flushed
+
+    def start(self) -> None:
+        """Starts the worker thread if it isn't running already, unless the queue was closed"""
+        with self._lock:
+            self._start()
+
+    def add(self, row: Any) -> None:
+        """Queues a model instance to be committed. Never blocks, unless the queue was closed.
+
+        Args:
+            row (Any): The model instance to commit
+        """
+        with self._lock:
+            if not self._closed:
+                self._start()
+                self._pending += 1
+                # Queued while holding the lock, so the row can't end up behind _STOP
+                self._queue.put(row)
+                return
+        logger.warning("Write-behind queue %s is closed, committing a row right away", self.name)
+        self._commit([row])
+
+    def close(self) -> None:
+        """Flushes every queued row and stops the worker thread. Blocks until done."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+            if thread is not None:
+                self._queue.put(_STOP)
+        if thread is None:
+            return
+        atexit.unregister(self.close)
+        thread.join()
+        with self._lock:
+            self._thread = None
+        logger.debug(
+            "Write-behind queue %s closed, %d rows flushed", self.name, self._flushed
+        )
+
+    def _start(self) -> None:
+        # Must be called with the lock held
+        if self._closed or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._thread = threading.Thread(
+            target=self._run, name=f"Eternal.database.{self.name}", daemon=True
+        )
+        self._thread.start()
+        # Daemon threads are killed on exit, make sure nothing queued is lost
+        atexit.register(self.close)
+        logger.debug("Write-behind queue %s started", self.name)
+
+    def _run(self) -> None:
+        batch: List[Any] = []
+        deadline: float = 0.0
+        while True:
+            timeout = None if not batch else max(deadline - time.monotonic(), 0.0)
+            try:
+                row = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                row = None
+            if row is _STOP:
+                self._flush(batch)
+                return
+            if row is not None:
+                if not batch:
+                    deadline = time.monotonic() + self.flush_interval
+                batch.append(row)
+            if len(batch) >= self.batch_size or (batch and time.monotonic() >= deadline):
+                self._flush(batch)
+                batch = []
+
+    def _flush(self, batch: List[Any]) -> None:
+        if not batch:
+            return
+        committed = self._commit(batch)
+        with self._lock:
+            self._pending -= len(batch)
+            if committed:
+                self._flushed += len(batch)
+        if committed:
+            logger.debug("Write-behind queue %s committed %d rows", self.name, len(batch))
+
+    def _commit(self, batch: List[Any]) -> bool:
+        # Returns whether the batch was committed, a failed commit is retried once before the rows are dropped
+        for attempt in range(2):
+            try:
+                with get_session() as session:
+                    session.add_all(batch)
+                return True
+            except Exception as e:
+                if attempt == 0:
+                    logger.warning(
+                        "Write-behind queue %s failed to commit %d rows, retrying",
+                        self.name,
+                        len(batch),
+                        exc_info=e,
+                    )
+                    time.sleep(_RETRY_DELAY)
+                    continue
+                logger.error(
+                    "Write-behind queue %s failed to commit %d rows, dropping them",
+                    self.name,
+                    len(batch),
+                    exc_info=e,
+                )
+        return False
@@ -1,40 +1,53 @@
-import re
-from string import ascii_letters as STANDARD_CHARACTERS
+import asyncio
 from typing import List
 
 import discord
 from discord.ext import commands
 
 from ..config.automod_config import BANNED_WORDS
-from ..database import get_session
+from ..database import WriteBehindQueue
 from ..database.models.warning import WarningModel
-
-
-def remove_non_standard_characters(s: str) -> str:
-    return re.sub(f"[^{re.escape(STANDARD_CHARACTERS)}]", "", s)
+from .matcher import WordMatcher
+from .normalization import normalize
 
 
 class AutoModeration(commands.Cog):
     banned_words: List[str]
+    matcher: WordMatcher
+    warning_queue: WriteBehindQueue
 
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.banned_words = [remove_non_standard_characters(i) for i in BANNED_WORDS]
+        self.matcher = WordMatcher()
+        self.load_banned_words(BANNED_WORDS)
+        # Warnings are committed in batches, so spam waves don't block the event loop on the database
+        self.warning_queue = WriteBehindQueue("automod")
+
+    async def cog_unload(self) -> None:
+        await asyncio.to_thread(self.warning_queue.close)
+
+    def load_banned_words(self, words: List[str]) -> None:
+        """Sets the banned words. The matcher is only rebuilt if the words have changed.
+
+        Args:
+            words (List[str]): The banned words
+        """
+        # Messages are normalized before matching, so the words have to be as well
+        self.banned_words = [normalize(i) for i in words]
+        self.matcher.update(self.banned_words)
 
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message):
         author: discord.Member = message.author # type: ignore
         content: str = message.content
         channel: discord.TextChannel = message.channel # type: ignore
-        if self.is_string_blacklisted(content.lower()):
+        if self.is_string_blacklisted(content):
             await message.delete()
             # Warn the sender
             warning = WarningModel(
                 author, self.bot.user, "Sending inappropriate messages (Automod)" # type: ignore
             )
-            with get_session() as session:
-                session.add(warning)
-                session.commit()
+            self.warning_queue.add(warning)
             await channel.send(
                 f"Get automated idiot {author.mention}", delete_after=5.0
             )
@@ -55,20 +68,28 @@ class AutoModeration(commands.Cog):
         Args:
             member (discord.Member): The member to check
         """
-        if member.display_name.lower() in self.banned_words:
+        if normalize(member.display_name) in self.banned_words:
             await member.edit(nick="Moderated Nickname")
             # Warn the member
             warning = WarningModel(
                 member, self.bot.user, "Inappropriate nickname or username (Automod)" # type: ignore
             )
-            with get_session() as session:
-                session.add(warning)
-                session.commit()
+            self.warning_queue.add(warning)
 
     def is_string_blacklisted(self, s: str) -> bool:
-        s = remove_non_standard_characters(s)
-        pattern = "|".join(self.banned_words)
-        return bool(re.search(pattern, s))
+        return self.find_banned_word(s) is not None
+
+    def find_banned_word(self, s: str) -> str | None:
+        """Finds the banned word contained in the string, if any.
+
+        Args:
+            s (str): The string to check
+
+        Returns:
+            str: The banned word that was found
+            None: The string contains no banned words
+        """
+        return self.matcher.search(normalize(s))
 
 
 async def setup(bot: commands.Bot):
@@ -0,0 +1,182 @@
+import asyncio
+import heapq
+import logging
+from datetime import datetime, timedelta
+from itertools import groupby
+from typing import Dict, List, Set, Tuple
+
+import discord
+from discord.ext import commands
+from sqlalchemy import update
+
+from ..config.ban_config import (
+    BAN_EXPIRY_BATCH_SIZE,
+    BAN_EXPIRY_MAX_RETRY_DELAY,
+    BAN_EXPIRY_MAX_SLEEP,
+    BAN_EXPIRY_RETRY_DELAY,
+)
+from ..database import run_in_session
+from ..database.models.ban import BanModel
+
+logger: logging.Logger = logging.getLogger("Eternal.Main")
+
+# (expires, banId, guildId, memberId), ordered by expiry first
+Expiration = Tuple[datetime, int, int, int]
+
+
+class BanExpiry(commands.Cog):
+    """Lifts temporary bans once they expire.
+
+    Upcoming expirations are kept in a min-heap, and the scheduler sleeps until the earliest one is due,
+    so the bans table is only read once on startup. Other cogs register new temporary bans using `schedule`.
+    Bans which fail to lift, e.g. while the guild is unavailable, are pushed back with an exponential backoff,
+    except when the bot isn't allowed to unban.
+    """
+    _heap: List[Expiration]
+    _scheduled: Set[int]
+    _attempts: Dict[int, int]
+    _wakeup: asyncio.Event | None
+    _task: asyncio.Task | None
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self._heap = []
+        self._scheduled = set()
+        self._attempts = dict()
+        self._wakeup = None
+        self._task = None
+
+    async def cog_unload(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # on_ready fires again after reconnects, only start once
+        if self._task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        await self.rebuild()
+        self._task = asyncio.create_task(self._run())
+
+    @property
+    def pending(self) -> int:
+        """The number of temporary bans waiting to expire"""
+        return len(self._heap)
+
+    async def rebuild(self) -> None:
+        """Reloads every temporary ban which hasn't been lifted yet from the database"""
+        bans: List[BanModel] = await run_in_session(
+            lambda session: session.query(BanModel)
+            .filter(BanModel.expires.isnot(None), BanModel.liftedAt.is_(None))
+            .all()
+        )
+        self._heap = []
+        self._scheduled = set()
+        self._attempts = dict()
+        for ban in bans:
+            if ban.guildId is None:
+                logger.warning("Ban %d has no guild, it can't be lifted automatically", ban.banId)
+                continue
+            self._heap.append((ban.expires, ban.banId, ban.guildId, ban.memberId))
+            self._scheduled.add(ban.banId)
+        heapq.heapify(self._heap)
+        logger.info("Loaded %d temporary bans", len(self._heap))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def schedule(self, ban: BanModel) -> None:
+        """Schedules a temporary ban to be lifted once it expires. The ban must already be committed.
+
+        Args:
+            ban (BanModel): The ban to schedule
+        """
+        if ban.expires is None or ban.guildId is None or ban.banId in self._scheduled:
+            return
+        heapq.heappush(self._heap, (ban.expires, ban.banId, ban.guildId, ban.memberId))
+        self._scheduled.add(ban.banId)
+        # Only wake the scheduler if this ban expires before the one it's currently sleeping for
+        if self._wakeup is not None and self._heap[0][1] == ban.banId:
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            now = datetime.now()
+            due: List[Expiration] = []
+            while self._heap and self._heap[0][0] <= now and len(due) < BAN_EXPIRY_BATCH_SIZE:
+                due.append(heapq.heappop(self._heap))
+            if due:
+                try:
+                    await self._lift(due)
+                except Exception as e:
+                    logger.error("Failed to lift %d expired bans", len(due), exc_info=e)
+                continue
+            timeout = BAN_EXPIRY_MAX_SLEEP
+            if self._heap:
+                timeout = min(timeout, (self._heap[0][0] - now).total_seconds())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def _retry(self, expiration: Expiration) -> None:
+        _, ban_id, guild_id, member_id = expiration
+        attempts = self._attempts.get(ban_id, 0) + 1
+        self._attempts[ban_id] = attempts
+        delay = min(BAN_EXPIRY_RETRY_DELAY * 2 ** (attempts - 1), BAN_EXPIRY_MAX_RETRY_DELAY)
+        heapq.heappush(self._heap, (datetime.now() + timedelta(seconds=delay), ban_id, guild_id, member_id))
+        logger.info("Retrying ban %d in %.0f seconds (attempt %d)", ban_id, delay, attempts + 1)
+
+    def _drop(self, ban_id: int) -> None:
+        self._scheduled.discard(ban_id)
+        self._attempts.pop(ban_id, None)
+
+    async def _lift(self, due: List[Expiration]) -> None:
+        lifted: List[Expiration] = []
+        for guild_id, expirations in groupby(sorted(due, key=lambda e: e[2]), key=lambda e: e[2]):
+            guild = self.bot.get_guild(guild_id)
+            for expiration in expirations:
+                _, ban_id, _, member_id = expiration
+                if guild is None:
+                    logger.warning("Can't lift ban %d, guild %d is unavailable", ban_id, guild_id)
+                    self._retry(expiration)
+                    continue
+                try:
+                    await guild.unban(discord.Object(id=member_id), reason="Temporary ban expired")
+                except discord.NotFound:
+                    pass  # Already unbanned by a moderator
+                except discord.Forbidden as e:
+                    # Retrying won't help until the bot's permissions change, the ban is loaded again on restart
+                    logger.error("Not allowed to lift ban %d in guild %d, giving up", ban_id, guild_id, exc_info=e)
+                    self._drop(ban_id)
+                    continue
+                except Exception as e:
+                    logger.error("Failed to lift ban %d", ban_id, exc_info=e)
+                    self._retry(expiration)
+                    continue
+                lifted.append(expiration)
+        if not lifted:
+            return
+        lifted_ids = [ban_id for _, ban_id, _, _ in lifted]
+        lifted_at = datetime.now()
+        try:
+            await run_in_session(
+                lambda session: session.execute(
+                    update(BanModel).where(BanModel.banId.in_(lifted_ids)).values(liftedAt=lifted_at)
+                )
+            )
+        except Exception as e:
+            # The retry finds the members already unbanned, and marks the bans as lifted then
+            logger.error("Failed to mark %d bans as lifted", len(lifted), exc_info=e)
+            for expiration in lifted:
+                self._retry(expiration)
+            return
+        for ban_id in lifted_ids:
+            self._drop(ban_id)
+        logger.info("Lifted %d expired bans", len(lifted))
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(BanExpiry(bot))
@@ -0,0 +1,100 @@
+"""Multi-pattern word matcher used by the automod module
+
+Implements an Aho-Corasick automaton, which finds any of the banned words in a single linear pass over the text,
+regardless of how many words are being searched for.
+
+Classes:
+    WordMatcher: Matches text against a list of words, rebuilding its automaton only when the list changes.
+"""
+from collections import deque
+from typing import Dict, Iterable, List, Tuple
+
+
+class WordMatcher:
+    _words: Tuple[str, ...]
+    _goto: List[Dict[str, int]]
+    _fail: List[int]
+    _output: List[str | None]
+
+    def __init__(self, words: Iterable[str] = ()) -> None:
+        self._words = ()
+        self._goto = [dict()]
+        self._fail = [0]
+        self._output = [None]
+        self.update(words)
+
+    @property
+    def words(self) -> Tuple[str, ...]:
+        return self._words
+
+    def update(self, words: Iterable[str]) -> bool:
+        """Replaces the word list, rebuilding the automaton if the words have changed.
+
+        Empty words are ignored, as they would match any text.
+
+        Args:
+            words (Iterable[str]): The words to match against
+
+        Returns:
+            bool: True if the automaton was rebuilt, otherwise False
+        """
+        words = tuple(dict.fromkeys(word for word in words if word))
+        if words == self._words:
+            return False
+        self._words = words
+        self._build()
+        return True
+
+    def search(self, s: str) -> str | None:
+        """Scans the string for any of the words.
+
+        Args:
+            s (str): The string to scan
+
+        Returns:
+            str: The first word found in the string
+            None: None of the words are present in the string
+        """
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for char in s:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state] is not None:
+                return output[state]
+        return None
+
+    def _build(self) -> None:
+        goto: List[Dict[str, int]] = [dict()]
+        output: List[str | None] = [None]
+        # Build the trie
+        for word in self._words:
+            state = 0
+            for char in word:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][char] = next_state
+                    goto.append(dict())
+                    output.append(None)
+                state = next_state
+            if output[state] is None:
+                output[state] = word
+        # Link failure transitions breadth-first, so that shorter suffixes are always resolved first
+        fail: List[int] = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in goto[state].items():
+                queue.append(next_state)
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[next_state] = goto[fallback].get(char, 0)
+                # A state also matches every word ending at its failure state
+                if output[next_state] is None:
+                    output[next_state] = output[fail[next_state]]
+        self._goto = goto
+        self._fail = fail
+        self._output = output
@@ -0,0 +1,111 @@
+"""Text normalization used by the automod module
+
+Folds text into words of lowercase ASCII letters, so that homoglyphs, leetspeak and separators can't be used to
+bypass automod. Normalization is a single `str.translate` pass over a precomputed table, and results are kept in a
+bounded LRU cache.
+
+Separators (spaces, punctuation, emoji...) split the text into words, which are joined by a single space, so a banned
+word can't match across two innocent words, e.g. "staff again". Letters which are spelled out one at a time, e.g.
+"f a g" or "f.a.g", are joined back into a word. Invisible characters and combining marks are dropped without
+splitting the word they are in.
+
+Functions:
+    normalize: Normalizes a string into words of lowercase ASCII letters.
+"""
+import unicodedata
+from functools import lru_cache
+from string import ascii_letters as STANDARD_CHARACTERS
+from typing import Dict, List
+
+from ..config.automod_config import NORMALIZATION_CACHE_SIZE
+
+# Characters which look like a latin letter, but don't decompose into one
+CONFUSABLES: Dict[str, str] = {
+    # Cyrillic
+    "а": "a", "в": "b", "е": "e", "ё": "e", "з": "3", "і": "i", "ї": "i", "ј": "j", "к": "k", "м": "m",
+    "н": "h", "о": "o", "п": "n", "р": "p", "с": "c", "т": "t", "у": "y", "ў": "y", "х": "x", "ѕ": "s",
+    "ԁ": "d", "ԛ": "q", "ԝ": "w", "ь": "b", "г": "r",
+    # Greek
+    "α": "a", "β": "b", "ε": "e", "η": "n", "ι": "i", "κ": "k", "ν": "v", "ο": "o", "ρ": "p", "τ": "t",
+    "υ": "u", "χ": "x", "γ": "y", "ω": "w",
+    # Latin lookalikes without a decomposition
+    "ı": "i", "ł": "l", "ø": "o", "đ": "d", "ħ": "h", "ŧ": "t", "ß": "ss", "æ": "ae", "œ": "oe",
+}
+
+# Digits and symbols commonly used in place of letters
+LEETSPEAK: Dict[str, str] = {
+    "0": "o", "1": "i", "3": "e", "4": "a", "5": "s", "6": "g", "7": "t", "8": "b", "9": "g",
+    "@": "a", "$": "s", "€": "e", "£": "l", "¡": "i", "|": "l",
+}
+
+
+# What separators are translated to, before the text is split into words
+_SEPARATOR: str = " "
+
+
+class _TranslationTable(dict):
+    """A `str.translate` table which maps every character to lowercase ASCII letters, a separator, or deletes it.
+
+    Characters are resolved the first time they are seen and memoized, so the table only ever holds characters
+    which have actually appeared in a message.
+    """
+
+    def __missing__(self, key: int) -> str | None:
+        value = self._resolve(chr(key))
+        self[key] = value
+        return value
+
+    @staticmethod
+    def _resolve(char: str) -> str | None:
+        lower = char.lower()
+        if lower in LEETSPEAK:
+            return LEETSPEAK[lower]
+        if lower in CONFUSABLES:
+            # Confusables may map onto leetspeak (e.g. "з" looks like "3")
+            folded = CONFUSABLES[lower]
+            return LEETSPEAK.get(folded, folded)
+        # Zero width characters and combining accents don't separate words
+        if unicodedata.category(char) in ("Cf", "Mn", "Me"):
+            return None
+        # Strip accents and compatibility forms (e.g. "é" or fullwidth letters)
+        folded = "".join(
+            c for c in unicodedata.normalize("NFKD", lower) if c in STANDARD_CHARACTERS
+        ).lower()
+        # Anything else is treated as a separator
+        return folded or _SEPARATOR
+
+
+_table = _TranslationTable(
+    {ord(c): c.lower() for c in STANDARD_CHARACTERS}
+)
+
+
+def _join_letters(letters: List[str]) -> List[str]:
+    # Single letters only form a word of their own when there are several in a row, e.g. not in "if a girl"
+    return ["".join(letters)] if len(letters) > 1 else letters
+
+
+@lru_cache(maxsize=NORMALIZATION_CACHE_SIZE)
+def normalize(s: str) -> str:
+    """Normalizes a string into words of lowercase ASCII letters, separated by single spaces.
+
+    Homoglyphs are folded into the letters they look like and leetspeak is mapped back to letters, within each word.
+    Every other character (spaces, punctuation, emoji...) separates words, and runs of single letters are joined.
+
+    Args:
+        s (str): The raw string
+
+    Returns:
+        str: The normalized string, e.g. "F.A.G or f@g" becomes "fag or fag"
+    """
+    words: List[str] = []
+    letters: List[str] = []
+    for word in s.translate(_table).split():
+        if len(word) == 1:
+            letters.append(word)
+            continue
+        words.extend(_join_letters(letters))
+        letters = []
+        words.append(word)
+    words.extend(_join_letters(letters))
+    return _SEPARATOR.join(words)
@@ -0,0 +1,56 @@
+"""Lets tests import modules from src without starting the bot, and provides a database created by the first release
+
+Importing `src` runs `src/__init__.py`, which reads the bot token and loads every extension, so the package is
+registered without running its `__init__`. The database module connects on import, to an in-memory database here.
+"""
+import os
+import sys
+import types
+from typing import List
+
+import pytest
+from sqlalchemy import Engine, create_engine
+
+ROOT: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault("eternal_db_url", "sqlite://")
+if "src" not in sys.modules:
+    package = types.ModuleType("src")
+    package.__path__ = [os.path.join(ROOT, "src")]
+    sys.modules["src"] = package
+
+from src.database.database import Base  # noqa: E402
+from src.database.migrations import migrate  # noqa: E402
+
+# The tables as the first release created them, before any migration
+BASELINE_SCHEMA: List[str] = [
+    "CREATE TABLE warnings ("
+    "warningId INTEGER NOT NULL PRIMARY KEY, memberId INTEGER, moderatorId INTEGER, reason VARCHAR, time DATETIME)",
+    "CREATE TABLE bans ("
+    "banId INTEGER NOT NULL PRIMARY KEY, memberId INTEGER, moderatorId INTEGER, reason VARCHAR, time DATETIME, "
+    "expires DATETIME)",
+]
+
+
+@pytest.fixture
+def baseline_engine(tmp_path) -> Engine:
+    engine = create_engine(f"sqlite:///{tmp_path}/baseline.db")
+    with engine.begin() as connection:
+        for statement in BASELINE_SCHEMA:
+            connection.exec_driver_sql(statement)
+        connection.exec_driver_sql(
+            "INSERT INTO warnings (memberId, moderatorId, reason, time) VALUES (?, ?, ?, ?)",
+            [(member % 50, 1, "spam", f"2024-01-01 00:{member % 60:02d}:00") for member in range(1000)],
+        )
+        connection.exec_driver_sql("ANALYZE")
+    # Same order as on startup, create_all only adds the tables which didn't exist yet
+    Base.metadata.create_all(engine)
+    migrate(engine)
+    yield engine
+    engine.dispose()
+
+
+def query_plan(engine: Engine, query: str, parameters: tuple = ()) -> str:
+    with engine.connect() as connection:
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {query}", parameters).all()
+    return "\n".join(row[-1] for row in rows)
@@ -0,0 +1,123 @@
+import asyncio
+import os
+from collections import Counter
+from typing import Awaitable, Callable, Dict
+
+from aiohttp import web
+
+from src.commands.transcript.assets import AssetMirror
+
+AVATAR: bytes = b"\x89PNG avatar"
+ATTACHMENT: bytes = b"\x89PNG attachment" * 1000
+
+
+class AssetServer:
+    """A local stand-in for Discord's CDN, serving `files` by path and counting the requests for each path"""
+    files: Dict[str, bytes]
+    requests: Counter
+    base_url: str
+    _runner: web.AppRunner | None
+
+    def __init__(self, files: Dict[str, bytes]) -> None:
+        self.files = files
+        self.requests = Counter()
+        self.base_url = ""
+        self._runner = None
+
+    async def __aenter__(self) -> "AssetServer":
+        app = web.Application()
+        app.router.add_get("/{path:.*}", self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]  # type: ignore
+        self.base_url = f"http://127.0.0.1:{port}"
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self._runner.cleanup()  # type: ignore
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        self.requests[request.path] += 1
+        body = self.files.get(request.path)
+        if body is None:
+            raise web.HTTPNotFound()
+        return web.Response(body=body, content_type="image/png")
+
+
+def run_with_mirror(tmp_path, test: Callable[[AssetServer, AssetMirror], Awaitable[None]], **options) -> None:
+    async def main() -> None:
+        files = {"/avatars/1/a.png": AVATAR, "/avatars/2/b.png": AVATAR, "/attachments/1/c.png": ATTACHMENT}
+        async with AssetServer(files) as server:
+            mirror = AssetMirror(cache_dir=str(tmp_path / "cache"), base_url="assets", **options)
+            try:
+                await test(server, mirror)
+            finally:
+                await mirror.close()
+
+    asyncio.run(main())
+
+
+def test_assets_are_downloaded_once(tmp_path) -> None:
+    async def test(server: AssetServer, mirror: AssetMirror) -> None:
+        # Signed CDN URLs only differ in their query
+        urls = [f"{server.base_url}/avatars/1/a.png?ex={i}" for i in range(20)]
+        references = await mirror.resolve_all(urls)
+        assert server.requests["/avatars/1/a.png"] == 1
+        assert len(set(references.values())) == 1
+        reference = references[urls[0]]
+        assert reference.startswith("assets/") and reference.endswith(".png")
+        assert await mirror.resolve(urls[0]) == reference
+        assert server.requests["/avatars/1/a.png"] == 1
+
+    run_with_mirror(tmp_path, test)
+
+
+def test_identical_assets_are_stored_once(tmp_path) -> None:
+    async def test(server: AssetServer, mirror: AssetMirror) -> None:
+        first = await mirror.resolve(f"{server.base_url}/avatars/1/a.png")
+        second = await mirror.resolve(f"{server.base_url}/avatars/2/b.png")
+        assert first == second
+        assert len([file for file in os.listdir(mirror.cache_dir) if file.endswith(".png")]) == 1
+
+    run_with_mirror(tmp_path, test)
+
+
+def test_failed_assets_are_not_requested_again(tmp_path) -> None:
+    async def test(server: AssetServer, mirror: AssetMirror) -> None:
+        missing = f"{server.base_url}/attachments/1/missing.png"
+        large = f"{server.base_url}/attachments/1/c.png"
+        for _ in range(5):
+            assert await mirror.resolve(missing) == missing
+            assert await mirror.resolve(large) == large
+        assert server.requests["/attachments/1/missing.png"] == 1
+        assert server.requests["/attachments/1/c.png"] == 1
+
+    run_with_mirror(tmp_path, test, max_bytes=len(ATTACHMENT) - 1)
+
+
+def test_failed_assets_are_retried_later(tmp_path) -> None:
+    async def test(server: AssetServer, mirror: AssetMirror) -> None:
+        url = f"{server.base_url}/attachments/2/d.png"
+        assert await mirror.resolve(url) == url
+        server.files["/attachments/2/d.png"] = ATTACHMENT
+        assert (await mirror.resolve(url)).startswith("assets/")
+        assert server.requests["/attachments/2/d.png"] == 2
+
+    run_with_mirror(tmp_path, test, retry_after=0)
+
+
+def test_referenced_assets_are_copied(tmp_path) -> None:
+    async def test(server: AssetServer, mirror: AssetMirror) -> None:
+        avatar = await mirror.resolve(f"{server.base_url}/avatars/1/a.png")
+        attachment = await mirror.resolve(f"{server.base_url}/attachments/1/c.png")
+        out_dir = tmp_path / "out"
+        out_dir.mkdir()
+        transcript = out_dir / "general.html"
+        transcript.write_text(f'<img class="avatar" src="{avatar}"> <img class="attachment" src="{attachment}">')
+        copies = mirror.copy_referenced([str(transcript)], str(out_dir))
+        assert sorted(copies) == sorted(str(out_dir / reference) for reference in (avatar, attachment))
+        assert (out_dir / attachment).read_bytes() == ATTACHMENT
+
+    run_with_mirror(tmp_path, test)
@@ -0,0 +1,37 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import Engine, Select
+
+from conftest import query_plan
+from src.commands.administration import Cursor, warning_page_statement
+from src.database.database import create_database_engine
+from src.database.migrations import MIGRATIONS
+
+
+def statement_plan(engine: Engine, statement: Select) -> str:
+    """Returns the query plan of a statement, exactly as SQLAlchemy sends it"""
+    compiled = statement.compile(dialect=engine.dialect)
+    parameters = tuple(compiled.params[name] for name in compiled.positiontup)  # type: ignore
+    return query_plan(engine, str(compiled), parameters)
+
+
+def test_migrate_sets_latest_version(baseline_engine: Engine) -> None:
+    with baseline_engine.connect() as connection:
+        assert connection.exec_driver_sql("PRAGMA user_version").scalar() == len(MIGRATIONS)
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [None, (datetime(2024, 1, 1, 0, 30), 500)],
+    ids=["first page", "next page"],
+)
+def test_warnings_listing_uses_index(baseline_engine: Engine, cursor: Cursor | None) -> None:
+    plan = statement_plan(baseline_engine, warning_page_statement(7, cursor))
+    assert "ix_warnings_memberId_time_warningId" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_only_sqlite_is_supported() -> None:
+    with pytest.raises(ValueError):
+        create_database_engine("postgresql://localhost/eternal")
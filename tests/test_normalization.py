@@ -0,0 +1,61 @@
+import pytest
+
+from src.config.automod_config import BANNED_WORDS
+from src.events.matcher import WordMatcher
+from src.events.normalization import normalize
+
+matcher = WordMatcher(normalize(word) for word in BANNED_WORDS)
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "fag",
+        "FAG",
+        "F A G",
+        "f.a.g",
+        "f@g",
+        "f4g",
+        "fаg",  # Cyrillic "а"
+        "f\u200ba\u200bg",  # Zero width spaces
+        "you f4gg0t",
+        "what a tr@nny",
+        "ＴＲＡＮＮＹ",  # Fullwidth
+        "flag got",
+        "flag, got",
+    ],
+)
+def test_banned_words_match(text: str) -> None:
+    assert matcher.search(normalize(text)) is not None
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "staff again",
+        "if a girl",
+        "of a game",
+        "staff.again",
+        "chief agent",
+        "leaf 4 go",
+        "I have 1 4 u",
+        "the flag is up",
+    ],
+)
+def test_innocent_text_does_not_match(text: str) -> None:
+    assert matcher.search(normalize(text)) is None
+
+
+@pytest.mark.parametrize(
+    "text, normalized",
+    [
+        ("Hello, World!", "hello world"),
+        ("F . A . G", "fag"),
+        ("café", "cafe"),
+        ("cafe\u0301", "cafe"),  # Combining accent
+        ("if a girl", "if a girl"),
+        ("h3ll0 w0rld", "hello world"),
+    ],
+)
+def test_normalize(text: str, normalized: str) -> None:
+    assert normalize(text) == normalized
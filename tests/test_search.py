@@ -0,0 +1,41 @@
+from typing import List
+
+from sqlalchemy import Engine
+
+from conftest import query_plan
+from src.commands.transcript.search import _DELETE_CHANNEL, _INSERT, _SEARCH
+
+
+def test_transcript_search_deletes_by_channel_index(baseline_engine: Engine) -> None:
+    plan = query_plan(baseline_engine, "DELETE FROM transcript_messages WHERE channelId = ?", (1,))
+    assert "ix_transcript_messages_channelId" in plan
+
+
+def test_transcript_search_follows_messages(baseline_engine: Engine) -> None:
+    def row(channel_id: int, message_id: int, content: str, private: bool = False) -> dict:
+        return {
+            "content": content, "author": "member", "channel": f"channel-{channel_id}", "guildId": 1,
+            "channelId": channel_id, "parentId": channel_id // 10, "private": private,
+            "messageId": message_id, "timestamp": 0,
+        }
+
+    def search(query: str, channel_ids: List[int], private_channel_ids: List[int]) -> List[int]:
+        parameters = {
+            "query": query, "guildId": 1, "channelIds": channel_ids, "privateChannelIds": private_channel_ids,
+            "limit": 10, "offset": 0,
+        }
+        return sorted(result[4] for result in connection.execute(_SEARCH, parameters))
+
+    with baseline_engine.begin() as connection:
+        connection.execute(
+            _INSERT,
+            [row(10, 1, "hello world"), row(20, 2, "hello there"), row(21, 3, "hello staff", private=True)],
+        )
+        assert search('"hello"', [1, 2], [2]) == [1, 2, 3]
+        # Messages from channels which can't be read, and private threads which can't be managed, are hidden
+        assert search('"hello"', [1, 2], []) == [1, 2]
+        assert search('"hello"', [1], []) == [1]
+        connection.execute(_DELETE_CHANNEL, {"channelId": 20})
+        assert search('"hello"', [1, 2], [2]) == [1, 3]
+        assert search('"there"', [1, 2], [2]) == []
+        connection.exec_driver_sql("INSERT INTO transcript_search (transcript_search) VALUES ('integrity-check')")